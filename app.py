@@ -13,10 +13,15 @@ from home_nav import register_nav
 from event_handlers import register_event_handlers
 from clean_list import register_clean_list
 from sharehouse_bot_manusal import register_bot_manuals
+from database_manager import start_manuals_watcher
+from sql_profiler import install_sql_profiler
+from lazy_listeners import register_lazy_metrics
+from handler_metrics import listener_executor, register_handler_metrics
 
 # .env を読み込み
 load_dotenv()
 init_db()
+install_sql_profiler()  # SQL_PROFILE=1 のときだけ
 
 # トークン
 BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
@@ -25,9 +30,11 @@ if not BOT_TOKEN or not APP_TOKEN:
     raise SystemExit("'.env' に SLACK_BOT_TOKEN と SLACK_APP_TOKEN を設定してください。")
 
 # アプリ本体
-app = App(token=BOT_TOKEN)
+app = App(token=BOT_TOKEN, listener_executor=listener_executor())  # リスナーごとの計測を引き継ぐ Executor
 
 # --- ハンドラ登録（register_* で統一） ---
+register_handler_metrics(app)  # リスナーごとの処理時間・SQL・Slack API 回数（最初に登録）
+register_lazy_metrics(app)  # lazy listener の待ち時間計測
 register_home(app)
 register_manuals(app)
 register_presence(app)
@@ -39,4 +46,5 @@ register_bot_manuals(app)
 
 # Socket Mode で起動
 if __name__ == "__main__":
+    start_manuals_watcher()  # MANUALS_FILE 指定時のみ（マニュアルの無停止更新）
     SocketModeHandler(app, APP_TOKEN).start()
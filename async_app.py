@@ -0,0 +1,191 @@
+# async_app.py
+"""
+asyncio 版の起動スクリプト（AsyncApp + AsyncSocketModeHandler）。
+
+    python async_app.py
+
+よく使われる経路（Home 表示・在宅状況の保存）は register_*_async のネイティブ async 版で処理し、
+Slack API は await（DM と Home 更新は並行）、DB 処理は DB 専用スレッド（run_in_db）で行う。
+それ以外の同期の register_* はそのまま SyncListenerBridge 経由で登録し、
+リスナー本体を専用スレッドで実行する（ack / say / respond はイベントループに戻して送る）。
+
+スレッドを使わないのはイベントループ上の待ちだけで、次の3か所はスレッド数が上限になる:
+- Slack API の送信（slack_call_async も同期版と同じ送信キュー）: SLACK_DISPATCH_WORKERS（既定 4）
+- DB 処理（run_in_db）: DB_EXECUTOR_WORKERS（既定 4、書き込みは1本ずつ）
+- 同期リスナー（SyncListenerBridge）: SYNC_LISTENER_WORKERS（既定 8）
+既定値はシェアハウス全員（数十人）が同時に操作する程度を想定している。
+Slack API はメソッドごとの上限（毎分 50〜100 回）の方が先に効くので、送信スレッドを増やしても速くはならない。
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from home import register_home, register_home_async
+from manuals import register_manuals
+from presence import register_presence, register_presence_async
+from sqlite_db_presence import call_in_connection_scope, init_db
+from events import register_events
+from home_nav import register_nav
+from event_handlers import register_event_handlers
+from clean_list import register_clean_list
+from sharehouse_bot_manusal import register_bot_manuals
+from database_manager import start_manuals_watcher
+from sql_profiler import install_sql_profiler
+from lazy_listeners import register_lazy_metrics_async
+from handler_metrics import register_handler_metrics_async
+from slack_dispatcher import sync_client
+
+logger = logging.getLogger(__name__)
+
+# 同期リスナーを実行するスレッド数（リスナー内の Slack API の待ち時間もここで過ごす。使い切ると次の同期リスナーは待つ）
+SYNC_LISTENER_WORKERS = int(os.getenv("SYNC_LISTENER_WORKERS", "8"))
+
+# ack / say / respond など、同期リスナーから呼べるようにイベントループへ戻す引数
+_LOOP_BOUND_ARGS = ("ack", "say", "respond", "complete", "fail", "set_status", "set_title", "set_suggested_prompts")
+
+
+class SyncListenerBridge:
+    """
+    AsyncApp を App と同じ書き方（@app.action(...) / app.view(...)(ack=..., lazy=[...])）で使うための薄い包み。
+    登録された同期関数は async 関数に包まれ、スレッドプールで実行される。
+    client には同じトークンの同期 WebClient を渡す。
+    """
+
+    def __init__(self, app, workers: int = SYNC_LISTENER_WORKERS):
+        self._app = app
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-listener")
+        # 登録時に app.client を使うモジュール向け（同期クライアント）
+        self.client = sync_client(app.client)
+
+    def _to_sync_kwargs(self, kwargs: dict, loop) -> dict:
+        converted = dict(kwargs)
+        for name in _LOOP_BOUND_ARGS:
+            fn = converted.get(name)
+            if fn is not None:
+                converted[name] = _blocking(fn, loop)
+        if converted.get("client") is not None:
+            converted["client"] = sync_client(converted["client"])
+        if converted.get("next") is not None:
+            converted["next"] = _blocking(converted["next"], loop)
+        return converted
+
+    def _wrap(self, func):
+        @functools.wraps(func)
+        async def handler(**kwargs):
+            loop = asyncio.get_running_loop()
+            sync_kwargs = self._to_sync_kwargs(kwargs, loop)
+            # 同期版の listener_executor と同じく、DB 接続の開閉と閉じ忘れたトランザクションの巻き戻しで囲み、
+            # ContextVar（handler_metrics の計測中のリクエスト）を引き継ぐ
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, call_in_connection_scope, func, **sync_kwargs)
+            return await loop.run_in_executor(self._executor, call)
+
+        return handler
+
+    def _listener(self, method: str, *args, **kwargs):
+        register = getattr(self._app, method)(*args, **kwargs)
+
+        def __call__(*funcs, **named):
+            if named:
+                # app.view(...)(ack=..., lazy=[...]) 形式
+                wrapped = {"ack": self._wrap(named["ack"])}
+                if named.get("lazy"):
+                    wrapped["lazy"] = [self._wrap(f) for f in named["lazy"]]
+                register(**wrapped)
+                return None
+            register(*[self._wrap(f) for f in funcs])
+            return funcs[0] if len(funcs) == 1 else None
+
+        return __call__
+
+    def action(self, *args, **kwargs):
+        return self._listener("action", *args, **kwargs)
+
+    def view(self, *args, **kwargs):
+        return self._listener("view", *args, **kwargs)
+
+    def event(self, *args, **kwargs):
+        return self._listener("event", *args, **kwargs)
+
+    def command(self, *args, **kwargs):
+        return self._listener("command", *args, **kwargs)
+
+    def shortcut(self, *args, **kwargs):
+        return self._listener("shortcut", *args, **kwargs)
+
+    def options(self, *args, **kwargs):
+        return self._listener("options", *args, **kwargs)
+
+    def message(self, *args, **kwargs):
+        return self._listener("message", *args, **kwargs)
+
+    def middleware(self, func):
+        self._app.middleware(self._wrap(func))
+        return func
+
+    use = middleware
+
+
+def _blocking(async_fn, loop):
+    """async 関数を、別スレッドから同期的に呼べる関数にする"""
+
+    def call(*args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(async_fn(*args, **kwargs), loop).result()
+
+    return call
+
+
+def create_async_app(token: str, **app_kwargs):
+    from slack_bolt.async_app import AsyncApp
+
+    app = AsyncApp(token=token, **app_kwargs)
+
+    # --- ハンドラ登録 ---
+    # Bolt は最初に一致したリスナーだけを実行するので、ネイティブ async 版を先に登録する
+    register_handler_metrics_async(app)  # 同期版と同じリスナーごとの計測（最初に登録）
+    register_lazy_metrics_async(app)
+    register_home_async(app)
+    register_presence_async(app)
+
+    bridge = SyncListenerBridge(app)
+    for register in (
+        register_home,
+        register_manuals,
+        register_presence,
+        register_events,
+        register_nav,
+        register_event_handlers,
+        register_clean_list,
+        register_bot_manuals,
+    ):
+        register(bridge)
+    return app
+
+
+async def main():
+    load_dotenv()
+    init_db()
+    install_sql_profiler()  # SQL_PROFILE=1 のときだけ
+
+    bot_token = os.getenv("SLACK_BOT_TOKEN")
+    app_token = os.getenv("SLACK_APP_TOKEN")
+    if not bot_token or not app_token:
+        raise SystemExit("'.env' に SLACK_BOT_TOKEN と SLACK_APP_TOKEN を設定してください。")
+    try:
+        import aiohttp  # noqa: F401  AsyncWebClient / AsyncSocketModeHandler が使う
+        from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+    except ImportError as e:
+        raise SystemExit("asyncio 版の起動には aiohttp が必要です（pip install aiohttp）。") from e
+
+    app = create_async_app(bot_token)
+    start_manuals_watcher()  # MANUALS_FILE 指定時のみ（マニュアルの無停止更新）
+    await AsyncSocketModeHandler(app, app_token).start_async()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
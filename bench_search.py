@@ -0,0 +1,181 @@
+# bench_search.py
+"""
+マニュアル検索のベンチマーク / 関連度評価（Slack トークン不要・オフラインで実行可能）
+
+    python bench_search.py                      # 1x / 10x / 100x
+    python bench_search.py --scales 10,100,1000 # 1000x（4万件）まで
+    python bench_search.py --scales 1,10 --repeat 5
+    MANUALS_BACKEND=fts DATABASE=sqlite:///bench.sqlite python bench_search.py  # FTS（作業用DBで）
+
+MANUALS_DATA を複製・加工した合成コーパスで database_manager の検索関数を回し、
+p50/p99 レイテンシ、インデックス構築時間とメモリ、precision@1 / recall@5 を出力する。
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import database_manager
+from manuals_data import MANUALS_DATA
+
+# 複製した項目のタイトルに付ける印（評価時に元タイトルへ戻す）
+_COPY_MARK = " #"
+
+# (クエリ, 正解タイトル, 検索モード)
+# keyword: search_manuals_by_keyword / ranked: search_manuals_ranked / mention: search_manuals_for_mention
+LABELED_QUERIES: List[Tuple[str, str, str]] = [
+    ("使用料", "使用料", "keyword"),
+    ("Wi-Fi", "Wi-Fi", "keyword"),
+    ("灯油", "灯油の補給", "keyword"),
+    ("駐車", "駐車場について", "keyword"),
+    ("リネン室", "リネン室", "keyword"),
+    ("ｗｉｆｉ", "Wi-Fi", "ranked"),
+    ("タバコ", "喫煙", "ranked"),
+    ("家賃", "使用料", "ranked"),
+    ("雪かき", "雪かき", "ranked"),
+    ("エアコン", "エアコン", "ranked"),
+    ("ゴミはいつ出せばいいですか", "ごみの持込日", "mention"),
+    ("Wi-Fiのパスワードを教えて", "Wi-Fi", "mention"),
+    ("家賃はいくらですか", "使用料", "mention"),
+    ("賃料の支払いについて", "使用料", "mention"),
+    ("部屋の鍵を中に置いたまま閉めてしまった", "個室の鍵の閉じこみについて", "mention"),
+    ("洗濯機はどこにありますか", "リネン室", "mention"),
+    ("タバコを吸える場所", "喫煙", "mention"),
+    ("荷物を送りたい", "荷物の送付", "mention"),
+    ("熱が出たときの連絡先", "体調が悪くなった場合", "mention"),
+    ("シェアハウスの住所", "平泉町志業シェアハウスの住所", "mention"),
+]
+
+_SEARCHERS: Dict[str, Callable] = {
+    "keyword": database_manager.search_manuals_by_keyword,
+    "ranked": database_manager.search_manuals_ranked,
+    "mention": database_manager.search_manuals_for_mention,
+}
+
+
+def synthetic_corpus(scale: int, seed: int = 0) -> List[dict]:
+    """MANUALS_DATA を scale 倍に増やした合成コーパス。複製は本文の文順を入れ替え、キーワードを間引く"""
+    rnd = random.Random(seed)
+    corpus = [dict(it) for it in MANUALS_DATA]
+    for k in range(1, scale):
+        for it in MANUALS_DATA:
+            sentences = it["body"].split("\n")
+            rnd.shuffle(sentences)
+            keywords = it["keywords"].split(",")
+            keywords = rnd.sample(keywords, max(1, len(keywords) * 2 // 3))
+            corpus.append(
+                {
+                    "title": f"{it['title']}{_COPY_MARK}{k}",
+                    "body": "\n".join(sentences),
+                    "keywords": ",".join(keywords),
+                }
+            )
+    return corpus
+
+
+def _base_title(title: str) -> str:
+    return title.split(_COPY_MARK, 1)[0]
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run_scale(scale: int, repeat: int) -> dict:
+    corpus = synthetic_corpus(scale)
+
+    # 構築時間とメモリは、前のインデックスを使わない新規構築で測る（reload_manuals は差分更新になる）
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index = database_manager._ManualIndex(corpus)
+    build_sec = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+
+    # 検索用にコーパスを差し替える
+    database_manager.reload_manuals(corpus)
+
+    latencies: Dict[str, List[float]] = {mode: [] for mode in _SEARCHERS}
+    hits_at_1: Dict[str, int] = {mode: 0 for mode in _SEARCHERS}
+    hits_at_5: Dict[str, int] = {mode: 0 for mode in _SEARCHERS}
+    counts: Dict[str, int] = {mode: 0 for mode in _SEARCHERS}
+
+    for query, expected, mode in LABELED_QUERIES:
+        search = _SEARCHERS[mode]
+        results = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            results = search(query)
+            latencies[mode].append((time.perf_counter() - t0) * 1000)
+        titles = [_base_title(r[0]) for r in results]
+        counts[mode] += 1
+        hits_at_1[mode] += int(titles[:1] == [expected])
+        # 複製は同じ正解を何件も含むため、重複を除いた上位5件で判定
+        top5 = list(dict.fromkeys(titles))[:5]
+        hits_at_5[mode] += int(expected in top5)
+
+    modes = {}
+    for mode, lat in latencies.items():
+        if not lat:
+            continue
+        modes[mode] = {
+            "p50_ms": round(statistics.median(lat), 3),
+            "p99_ms": round(_percentile(lat, 99), 3),
+            "precision_at_1": round(hits_at_1[mode] / counts[mode], 3),
+            "recall_at_5": round(hits_at_5[mode] / counts[mode], 3),
+        }
+    return {
+        "scale": scale,
+        "entries": len(corpus),
+        "backend": database_manager.MANUALS_BACKEND,
+        "build_sec": round(build_sec, 3),
+        "build_mem_kb": round(current / 1024, 1),
+        "build_peak_kb": round(peak / 1024, 1),
+        "modes": modes,
+    }
+
+
+def _print_report(rows: List[dict]) -> None:
+    print(f"backend={rows[0]['backend'] if rows else database_manager.MANUALS_BACKEND}")
+    print(f"{'scale':>6} {'entries':>8} {'build_s':>8} {'mem_kb':>10} {'mode':>8} "
+          f"{'p50_ms':>8} {'p99_ms':>8} {'P@1':>6} {'R@5':>6}")
+    for row in rows:
+        for mode, m in row["modes"].items():
+            print(
+                f"{row['scale']:>6} {row['entries']:>8} {row['build_sec']:>8} {row['build_mem_kb']:>10} {mode:>8} "
+                f"{m['p50_ms']:>8} {m['p99_ms']:>8} {m['precision_at_1']:>6} {m['recall_at_5']:>6}"
+            )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="マニュアル検索のベンチマーク")
+    parser.add_argument("--scales", default="1,10,100", help="コーパス倍率（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=20, help="クエリごとの繰り返し回数")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力")
+    args = parser.parse_args(argv)
+
+    original = list(database_manager.current_manuals())
+    rows = []
+    try:
+        for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+            rows.append(run_scale(scale, args.repeat))
+    finally:
+        database_manager.reload_manuals(original)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        _print_report(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
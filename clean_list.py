@@ -1,9 +1,17 @@
 # clean_list.py
-from datetime import datetime, timedelta, time
+import functools
+import json
+import operator
+import os
+import threading
+from datetime import date, datetime, timedelta, time
 from zoneinfo import ZoneInfo
-from peewee import JOIN  # （未使用でも最小変更のため残置）
+from peewee import JOIN, Case, Tuple, Value, fn
 
-from sqlite_db_presence import db, User, CleaningLog
+from sqlite_db_presence import db, User, CleaningLog, parse_db_datetime, write_transaction
+from ui_builders import invalidate_home_cache
+from lazy_listeners import lazy_task
+from slack_dispatcher import PRIORITY_MODAL, slack_call
 
 TZ_JST = ZoneInfo("Asia/Tokyo")
 TZ_UTC = ZoneInfo("UTC")
@@ -25,6 +33,23 @@ CLEAN_LOCATIONS = [
     "玄関",
 ]
 
+# 掃除間隔の目安（日）。これより空いた場所を「掃除状況」で強調する
+# 環境変数 CLEAN_INTERVAL_DAYS="キッチン=1,玄関=14" で場所ごとに上書きできる
+DEFAULT_CLEAN_INTERVAL_DAYS = 7
+CLEAN_INTERVAL_DAYS: dict[str, int] = {
+    "キッチン": 2,
+    "男子トイレ1階": 3,
+    "女子トイレ1階": 3,
+    "男子トイレ2階": 3,
+    "女子トイレ2階": 3,
+    "お風呂（男）": 3,
+    "お風呂（女）": 3,
+}
+for _item in os.getenv("CLEAN_INTERVAL_DAYS", "").split(","):
+    _loc, _sep, _days = _item.partition("=")
+    if _sep and _days.strip().isdigit():
+        CLEAN_INTERVAL_DAYS[_loc.strip()] = int(_days.strip())
+
 
 def _to_utc_naive(dt_jst: datetime) -> datetime:
     if dt_jst.tzinfo is None:
@@ -40,18 +65,26 @@ def _ellipsis(s: str | None, n: int = 60) -> str:
 
 def _save_cleaning_log(user_id: str, location: str, note: str | None):
     user_obj, _ = User.get_or_create(slack_user_id=user_id)
-    with db.atomic():
+    with write_transaction():
         CleaningLog.create(user=user_obj, location=location, note=(note or "").strip())
+    invalidate_home_cache()
+    invalidate_cleaning_status()
+
+
+# ==== 履歴取得（期間と件数は SQL で絞る） ====
+def _history_lower_bound_utc(days: int) -> datetime:
+    """直近 days 日（JST の日付で今日を含む）の開始時刻を UTC naive で"""
+    since_jst_date = datetime.now(TZ_JST).date() - timedelta(days=days - 1)
+    return _to_utc_naive(datetime.combine(since_jst_date, time(0, 0), tzinfo=TZ_JST))
 
 
-# ==== 履歴取得（型ゆらぎに強い: Python側でフィルタ） ====
-def _fetch_logs(days: int | None, limit: int = 60):
+def _history_query(days: int | None, location: str | None = None):
     """
-    CleaningLog を新しい順で取得。days=None は全期間。
-    ここでは DB の型揺れ対策として、取得後に Python 側で期間フィルタします。
+    履歴の検索条件（期間・場所）だけを付けたクエリ。days=None は全期間。
+    timestamp のインデックスで範囲を絞り、文字列の書式揺れ（"T" 区切り・"Z" 付きなど）は
+    SQLite の datetime() で正規化して境界を判定する（migrate_timestamps.py 実行後は揺れは無い）。
     """
-    q = CleaningLog.select().order_by(CleaningLog.timestamp.desc())
-    rows = list(q)
+    q = CleaningLog.select(CleaningLog, User).join(User, JOIN.LEFT_OUTER)
 
     # "7"/"30"/"all" の混在に対応
     _days: int | None = None
@@ -62,60 +95,73 @@ def _fetch_logs(days: int | None, limit: int = 60):
             _days = None
 
     if _days and _days > 0:
-        since_jst_date = datetime.now(TZ_JST).date() - timedelta(days=_days - 1)
-
-        def _to_jst(ts_val):
-            if isinstance(ts_val, datetime):
-                dt = ts_val
-            elif isinstance(ts_val, (str, bytes)):
-                s = ts_val.decode("utf-8", "ignore") if isinstance(ts_val, bytes) else ts_val
-                s = s.strip()
-                if s.endswith("Z"):
-                    s = s[:-1] + "+00:00"
-                try:
-                    dt = datetime.fromisoformat(s)
-                except Exception:
-                    try:
-                        dt = datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-                    except Exception:
-                        dt = datetime.utcnow()
-            else:
-                dt = datetime.utcnow()
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=TZ_UTC)
-            return dt.astimezone(TZ_JST)
-
-        rows = [r for r in rows if _to_jst(getattr(r, "timestamp", None)).date() >= since_jst_date]
-
-    return rows[:limit]
+        lower = _history_lower_bound_utc(_days)
+        q = q.where(
+            # 書式が揺れても日付部分は同じなので、1日手前までをインデックスで取り、境界は正確に判定
+            (CleaningLog.timestamp >= lower - timedelta(days=1))
+            & (fn.datetime(CleaningLog.timestamp) >= lower.strftime("%Y-%m-%d %H:%M:%S"))
+        )
+    if location:
+        q = q.where(CleaningLog.location == location)
+    return q
+
+
+# 履歴モーダルの1ページの件数（1セクションあたり HISTORY_LINES_PER_SECTION 行に分けて文字数上限を避ける）
+HISTORY_PAGE_SIZE = 20
+HISTORY_LINES_PER_SECTION = 10
+# 場所の絞り込みで「すべて」を表す値
+HISTORY_ALL_LOCATIONS = "__all__"
+
+# ページ位置: (timestamp の保存値, id)
+HistoryCursor = tuple[str, int]
+
+
+def _history_cursor(row: CleaningLog) -> HistoryCursor:
+    # 並び順と同じく保存値の文字列で比較する（移行前の "T" 区切り・"Z" 付きなども読み直さずそのまま使う）
+    return (row.timestamp_raw, row.id)
+
+
+def _fetch_history_page(
+    days: int | None,
+    location: str | None,
+    older_than: HistoryCursor | None = None,
+    newer_than: HistoryCursor | None = None,
+) -> tuple[list[CleaningLog], bool]:
+    """
+    (timestamp, id) のキーセットで1ページ分を新しい順に取得（どのページでもインデックスを使う1クエリ）。
+    older_than: そのカーソルより古いページ（次へ） / newer_than: より新しいページ（前へ）。
+    返り値: (行, その向きにさらに続きがあるか)
+    """
+    ts, pk = CleaningLog.timestamp, CleaningLog.id
+    # カーソル用に保存値の文字列も取る（timestamp は peewee が datetime に変換してしまう）
+    q = _history_query(days, location).select_extend(ts.cast("TEXT").alias("timestamp_raw"))
+    if newer_than is not None:
+        c_ts, c_id = newer_than
+        q = q.where(Tuple(ts, pk) > (c_ts, c_id)).order_by(ts.asc(), pk.asc())
+    else:
+        if older_than is not None:
+            c_ts, c_id = older_than
+            # 行値の比較にするとインデックスの範囲検索になる（OR で書くと先頭から走査になる）
+            q = q.where(Tuple(ts, pk) < (c_ts, c_id))
+        q = q.order_by(ts.desc(), pk.desc())
+    rows = list(q.limit(HISTORY_PAGE_SIZE + 1))
+    has_more = len(rows) > HISTORY_PAGE_SIZE
+    rows = rows[:HISTORY_PAGE_SIZE]
+    if newer_than is not None:
+        rows.reverse()
+    return rows, has_more
+
+
+def _to_jst(ts_val) -> datetime:
+    """timestamp（UTC naive）を JST に。移行前の書式揺れは parse_db_datetime で吸収する"""
+    dt = parse_db_datetime(ts_val)
+    if dt is None:
+        dt = datetime.utcnow()
+    return dt.replace(tzinfo=TZ_UTC).astimezone(TZ_JST)
 
 
 def _fmt_log_line(row: CleaningLog) -> str:
-    ts = row.timestamp
-
-    def _to_jst(ts_val):
-        if isinstance(ts_val, datetime):
-            dt = ts_val
-        elif isinstance(ts_val, (str, bytes)):
-            s = ts_val.decode("utf-8", "ignore") if isinstance(ts_val, bytes) else ts_val
-            s = s.strip()
-            if s.endswith("Z"):
-                s = s[:-1] + "+00:00"
-            try:
-                dt = datetime.fromisoformat(s)
-            except Exception:
-                try:
-                    dt = datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    dt = datetime.utcnow()
-        else:
-            dt = datetime.utcnow()
-
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=TZ_UTC)
-        return dt.astimezone(TZ_JST)
-
-    ts_jst = _to_jst(ts)
+    ts_jst = _to_jst(row.timestamp)
     label = ts_jst.strftime("%m/%d %H:%M")
     uid = getattr(row, "user", None)
     uid = getattr(uid, "slack_user_id", "") if uid else ""
@@ -133,49 +179,269 @@ def _fmt_log_line(row: CleaningLog) -> str:
     return f"・{label} ｜ {row.location} ｜ <@{uid}>{note_part}"
 
 
-def _build_history_blocks(days: int | None = 7) -> list[dict]:
-    period_label = {7: "過去7日", 30: "過去30日", None: "全期間"}[days]
-    rows = _fetch_logs(days=days, limit=60)
-    body = "\n".join(_fmt_log_line(r) for r in rows) if rows else "記録がありません。"
+def _history_state(metadata: str | None) -> dict:
+    """private_metadata（JSON）から履歴モーダルの状態を読む。旧形式（"7" / "all" / "init"）にも対応"""
+    state = {"days": 7, "loc": None, "page": 0, "first": None, "last": None}
+    try:
+        data = json.loads(metadata or "")
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        state.update({k: data.get(k, state[k]) for k in state})
+    elif metadata == "all":
+        state["days"] = None
+    elif metadata and metadata.isdigit():
+        state["days"] = int(metadata)
+    return state
+
+
+def _history_period_elements() -> list[dict]:
     return [
-        {"type": "section", "text": {"type": "mrkdwn", "text": f"*🗂️ 掃除履歴* — {period_label}"}},
         {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "過去7日"},
-                    "action_id": "history_days_7",
-                    "value": "7",
-                },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "過去30日"},
-                    "action_id": "history_days_30",
-                    "value": "30",
-                },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "全期間"},
-                    "action_id": "history_days_all",
-                    "value": "all",
-                },
-            ],
+            "type": "button",
+            "text": {"type": "plain_text", "text": "過去7日"},
+            "action_id": "history_days_7",
+            "value": "7",
+        },
+        {
+            "type": "button",
+            "text": {"type": "plain_text", "text": "過去30日"},
+            "action_id": "history_days_30",
+            "value": "30",
+        },
+        {
+            "type": "button",
+            "text": {"type": "plain_text", "text": "全期間"},
+            "action_id": "history_days_all",
+            "value": "all",
         },
-        {"type": "divider"},
-        {"type": "section", "text": {"type": "mrkdwn", "text": body}},
     ]
 
 
-def _build_history_modal(days: int | None = 7) -> dict:
-    meta = "all" if days is None else str(days)
+def _history_location_select(location: str | None) -> dict:
+    all_option = {"text": {"type": "plain_text", "text": "すべての場所"}, "value": HISTORY_ALL_LOCATIONS}
+    options = [all_option] + [{"text": {"type": "plain_text", "text": loc}, "value": loc} for loc in CLEAN_LOCATIONS]
+    selected = next((o for o in options if o["value"] == location), all_option)
+    return {
+        "type": "static_select",
+        "action_id": "history_location",
+        "options": options,
+        "initial_option": selected,
+    }
+
+
+def _build_history_blocks(state: dict, rows: list[CleaningLog], has_next: bool) -> list[dict]:
+    days = state["days"]
+    period_label = {7: "過去7日", 30: "過去30日", None: "全期間"}.get(days, f"過去{days}日")
+    loc_label = f"｜{state['loc']}" if state["loc"] else ""
+    page_label = f"（{state['page'] + 1}ページ目）" if (state["page"] or has_next) else ""
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": f"*🗂️ 掃除履歴* — {period_label}{loc_label}{page_label}"},
+        },
+        {"type": "actions", "elements": _history_period_elements() + [_history_location_select(state["loc"])]},
+        {"type": "divider"},
+    ]
+    if not rows:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "記録がありません。"}})
+    lines = [_fmt_log_line(r) for r in rows]
+    for i in range(0, len(lines), HISTORY_LINES_PER_SECTION):
+        text = "\n".join(lines[i : i + HISTORY_LINES_PER_SECTION])
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text}})
+
+    pager = []
+    if state["page"] > 0:
+        pager.append({"type": "button", "text": {"type": "plain_text", "text": "← 前へ"}, "action_id": "history_prev"})
+    if has_next:
+        pager.append({"type": "button", "text": {"type": "plain_text", "text": "次へ →"}, "action_id": "history_next"})
+    if pager:
+        blocks.append({"type": "actions", "elements": pager})
+    return blocks
+
+
+def _build_history_modal(
+    days: int | None = 7, location: str | None = None, state: dict | None = None, move: str | None = None
+) -> dict:
+    """
+    履歴モーダル。state（現在の表示状態）と move（"next" / "prev"）を渡すとページを移動する。
+    表示中のページの先頭・末尾のカーソルを private_metadata に持つ。
+    """
+    if state is None or move is None:
+        state = {"days": days, "loc": location, "page": 0, "first": None, "last": None}
+        rows, has_next = _fetch_history_page(state["days"], state["loc"])
+    elif move == "next" and state["last"]:
+        rows, has_next = _fetch_history_page(state["days"], state["loc"], older_than=tuple(state["last"]))
+        state["page"] += 1
+    elif move == "prev" and state["first"] and state["page"] > 1:
+        rows, _has_newer = _fetch_history_page(state["days"], state["loc"], newer_than=tuple(state["first"]))
+        state["page"] -= 1
+        has_next = True
+    else:
+        # 先頭ページへ戻る（カーソルが無い場合も含む）
+        state["page"] = 0
+        rows, has_next = _fetch_history_page(state["days"], state["loc"])
+
+    state["first"] = list(_history_cursor(rows[0])) if rows else None
+    state["last"] = list(_history_cursor(rows[-1])) if rows else None
     return {
         "type": "modal",
         "callback_id": "cleaning_history_modal",
         "title": {"type": "plain_text", "text": "掃除履歴"},
         "close": {"type": "plain_text", "text": "閉じる"},
-        "private_metadata": meta,
-        "blocks": _build_history_blocks(days),
+        "private_metadata": json.dumps(state, ensure_ascii=False),
+        "blocks": _build_history_blocks(state, rows, has_next),
+    }
+
+
+# ==== 掃除状況（場所ごとの集計） ====
+# 集計は書き込み（_save_cleaning_log）か日付が変わるまで使い回す
+STATUS_TOP_CONTRIBUTORS = 3
+
+_status_cache: tuple[date, list[dict]] | None = None
+_status_lock = threading.Lock()
+_status_version = 0
+
+
+def invalidate_cleaning_status() -> None:
+    """掃除状況の集計を破棄（掃除記録の保存後に呼ぶ）"""
+    global _status_cache, _status_version
+    with _status_lock:
+        _status_cache = None
+        _status_version += 1
+
+
+def _fetch_last_cleaned() -> dict[str, datetime | None]:
+    """
+    場所ごとの最終掃除時刻（UTC naive）。
+    場所ごとの MAX を UNION ALL でまとめた1クエリで、(location, timestamp) インデックスの末尾を読むだけ（履歴の件数によらない）。
+    """
+    C = CleaningLog
+    parts = [
+        C.select(Value(loc).alias("location"), fn.MAX(C.timestamp).alias("last")).where(C.location == loc)
+        for loc in CLEAN_LOCATIONS
+    ]
+    query = functools.reduce(operator.add, parts)
+    return {loc: parse_db_datetime(last) for loc, last in query.tuples()}
+
+
+def _fetch_recent_counts(days: int = 30, recent_days: int = 7) -> list[tuple[str, str, int, int]]:
+    """
+    直近 days 日の (場所, 人) ごとの回数と、そのうち直近 recent_days 日の回数を1回の GROUP BY で。
+    location IN (...) と timestamp の下限で (location, timestamp) インデックスの範囲だけを読む。
+    """
+    C = CleaningLog
+    lower = _history_lower_bound_utc(days)
+    recent = _history_lower_bound_utc(recent_days).strftime("%Y-%m-%d %H:%M:%S")
+    normalized = fn.datetime(C.timestamp)
+    query = (
+        C.select(
+            C.location,
+            C.user,
+            fn.COUNT(C.id),
+            fn.SUM(Case(None, [(normalized >= recent, 1)], 0)),
+        )
+        .where(
+            C.location.in_(CLEAN_LOCATIONS)
+            # 書式揺れに備えて1日手前までをインデックスで取り、境界は正規化して判定（_history_query と同じ）
+            & (C.timestamp >= lower - timedelta(days=1))
+            & (normalized >= lower.strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        .group_by(C.location, C.user)
+        .tuples()
+    )
+    return [(loc, uid, n, int(n_recent or 0)) for loc, uid, n, n_recent in query]
+
+
+def _aggregate_cleaning_status() -> list[dict]:
+    last_cleaned = _fetch_last_cleaned()
+    status = {
+        loc: {"location": loc, "last": last_cleaned.get(loc), "n7": 0, "n30": 0, "top": []}
+        for loc in CLEAN_LOCATIONS
+    }
+    for loc, uid, n30, n7 in _fetch_recent_counts():
+        st = status[loc]
+        st["n30"] += n30
+        st["n7"] += n7
+        st["top"].append((uid, n30))
+    for st in status.values():
+        st["top"] = sorted(st["top"], key=lambda t: (-t[1], t[0] or ""))[:STATUS_TOP_CONTRIBUTORS]
+    return list(status.values())
+
+
+def cleaning_status() -> list[dict]:
+    """
+    場所ごとの {location, last（UTC naive / None）, n7, n30, top: [(user_id, 回数)]}（CLEAN_LOCATIONS の順）。
+    集計は保存か日付の変わり目まで使い回す。
+    """
+    global _status_cache
+    today = datetime.now(TZ_JST).date()
+    with _status_lock:
+        if _status_cache is not None and _status_cache[0] == today:
+            return _status_cache[1]
+        version = _status_version
+    rows = _aggregate_cleaning_status()
+    with _status_lock:
+        # 集計中に保存があった場合は古い可能性があるので保存しない
+        if version == _status_version:
+            _status_cache = (today, rows)
+    return rows
+
+
+def _status_line(st: dict, today: date) -> tuple[bool, str]:
+    """返り値: (目安を過ぎているか, 表示行)"""
+    interval = CLEAN_INTERVAL_DAYS.get(st["location"], DEFAULT_CLEAN_INTERVAL_DAYS)
+    if st["last"] is None:
+        overdue, last_label = True, "記録なし"
+    else:
+        last_jst = _to_jst(st["last"])
+        elapsed = (today - last_jst.date()).days
+        overdue = elapsed > interval
+        ago = "今日" if elapsed == 0 else f"{elapsed}日前"
+        last_label = f"{last_jst:%m/%d}（{ago}）"
+    mark = "⚠️" if overdue else "✅"
+    top = "、".join(f"<@{uid}> {n}回" for uid, n in st["top"])
+    top_part = f" ｜ {top}" if top else ""
+    return overdue, (
+        f"{mark} *{st['location']}* — 最終 {last_label}・目安{interval}日"
+        f" ｜ 7日 {st['n7']}回 / 30日 {st['n30']}回{top_part}"
+    )
+
+
+def _build_status_modal() -> dict:
+    today = datetime.now(TZ_JST).date()
+    overdue_lines, ok_lines = [], []
+    for st in cleaning_status():
+        overdue, line = _status_line(st, today)
+        (overdue_lines if overdue else ok_lines).append(line)
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*📊 掃除状況*（{today:%m/%d} 時点）　要掃除 {len(overdue_lines)} / {len(CLEAN_LOCATIONS)}か所",
+            },
+        },
+        {"type": "divider"},
+    ]
+    # 目安を過ぎた場所を先に出す
+    for lines in (overdue_lines, ok_lines):
+        if lines:
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)}})
+    blocks.append(
+        {
+            "type": "context",
+            "elements": [{"type": "mrkdwn", "text": "⚠️ は目安の日数より空いている場所（名前は直近30日の回数の多い人）"}],
+        }
+    )
+    return {
+        "type": "modal",
+        "callback_id": "cleaning_status_modal",
+        "title": {"type": "plain_text", "text": "掃除状況"},
+        "close": {"type": "plain_text", "text": "閉じる"},
+        "blocks": blocks,
     }
 
 
@@ -269,20 +535,30 @@ def register_clean_list(app):
     def handle_cleaning_open(ack, body, client, logger):
         ack()
         user_id = body["user"]["id"]
-        client.views_open(trigger_id=body["trigger_id"], view=_build_cleaning_modal(user_id))
+        slack_call(
+            client,
+            "views_open",
+            priority=PRIORITY_MODAL,
+            trigger_id=body["trigger_id"],
+            view=_build_cleaning_modal(user_id),
+        )
 
     @app.action("check_cleaning")  # 互換: 既存の action_id でも同じ挙動
     def handle_check_cleaning_compat(ack, body, client, logger):
         ack()
         user_id = body["user"]["id"]
-        client.views_open(trigger_id=body["trigger_id"], view=_build_cleaning_modal(user_id))
+        slack_call(
+            client,
+            "views_open",
+            priority=PRIORITY_MODAL,
+            trigger_id=body["trigger_id"],
+            view=_build_cleaning_modal(user_id),
+        )
 
     # ====== 掃除チェック：モーダル送信 ======
-    # 置き換え：@app.view("cleaning_log_modal") のハンドラ全体
-
+    # 入力チェックと完了画面の ack だけ即時に返し、保存は lazy listener で行う
 
-    @app.view("cleaning_log_modal")
-    def handle_cleaning_submit(ack, body, client, logger):
+    def _read_cleaning_submission(body):
         view = body.get("view", {})  # ★ view 以下に各値があります
         user = body.get("user", {})  # 念のためフォールバック用
         user_id = view.get("private_metadata") or user.get("id")  # ★ 修正
@@ -298,17 +574,15 @@ def register_clean_list(app):
             errors["loc_block"] = "掃除箇所を選択してください。"
         if note_val and len(note_val) > 200:
             errors["note_block"] = "メモは200文字以内にしてください。"
+        return user_id, loc_sel, note_val, errors
 
+    def _ack_cleaning_submit(ack, body):
+        _user_id, loc_sel, note_val, errors = _read_cleaning_submission(body)
         if errors:
             ack(response_action="errors", errors=errors)
             return
 
-        # 保存して完了画面に更新
-        try:
-            _save_cleaning_log(user_id, loc_sel["value"], (note_val or "").strip())
-        except Exception:
-            logger.exception("saving CleaningLog failed")
-
+        # 完了画面に更新
         ack(
             response_action="update",
             view={
@@ -331,15 +605,56 @@ def register_clean_list(app):
             },
         )
 
+    @lazy_task
+    def handle_cleaning_submit(body, client, logger, context):
+        user_id, loc_sel, note_val, errors = _read_cleaning_submission(body)
+        if errors:
+            return
+        # 保存
+        try:
+            _save_cleaning_log(user_id, loc_sel["value"], (note_val or "").strip())
+        except Exception:
+            logger.exception("saving CleaningLog failed")
+
+    app.view("cleaning_log_modal")(ack=_ack_cleaning_submit, lazy=[handle_cleaning_submit])
+
+    # ====== 掃除状況（場所ごとの最終掃除日と回数） ======
+    @app.action("cleaning_status")
+    def open_status_modal(ack, body, client, logger):
+        ack()
+        slack_call(
+            client,
+            "views_open",
+            priority=PRIORITY_MODAL,
+            trigger_id=body["trigger_id"],
+            view=_build_status_modal(),
+        )
+
     # ====== 掃除履歴（既存のモーダル遷移） ======
     @app.action("cleaning_history")
     def open_history_modal(ack, body, client, logger):
         ack()
         try:
-            client.views_open(trigger_id=body["trigger_id"], view=_build_history_modal_empty())
+            slack_call(
+                client,
+                "views_open",
+                priority=PRIORITY_MODAL,
+                trigger_id=body["trigger_id"],
+                view=_build_history_modal_empty(),
+            )
         except Exception as e:
             logger.exception("cleaning_history failed")
 
+    def _update_history(body, client, view: dict):
+        slack_call(
+            client,
+            "views_update",
+            priority=PRIORITY_MODAL,
+            view_id=body["view"]["id"],
+            hash=body["view"]["hash"],
+            view=view,
+        )
+
     @app.action("history_days_7")
     @app.action("history_days_30")
     @app.action("history_days_all")
@@ -347,8 +662,21 @@ def register_clean_list(app):
         ack()
         val = body["actions"][0]["value"]  # "7" / "30" / "all"
         days = None if val == "all" else int(val)
-        client.views_update(
-            view_id=body["view"]["id"],
-            hash=body["view"]["hash"],
-            view=_build_history_modal(days=days),
-        )
+        state = _history_state(body["view"].get("private_metadata"))
+        _update_history(body, client, _build_history_modal(days=days, location=state["loc"]))
+
+    @app.action("history_location")
+    def change_history_location(ack, body, client, logger):
+        ack()
+        val = body["actions"][0]["selected_option"]["value"]
+        location = None if val == HISTORY_ALL_LOCATIONS else val
+        state = _history_state(body["view"].get("private_metadata"))
+        _update_history(body, client, _build_history_modal(days=state["days"], location=location))
+
+    @app.action("history_next")
+    @app.action("history_prev")
+    def page_history(ack, body, client, logger):
+        ack()
+        move = "next" if body["actions"][0]["action_id"] == "history_next" else "prev"
+        state = _history_state(body["view"].get("private_metadata"))
+        _update_history(body, client, _build_history_modal(state=state, move=move))
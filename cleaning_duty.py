@@ -0,0 +1,236 @@
+# cleaning_duty.py
+"""
+掃除当番の週ごとの割り当て。
+
+    ensure_week_duties()          # 今週の当番が無ければ割り当てて保存（Home を開いたときに呼ぶ）
+    python cleaning_duty.py       # 今週の当番を表示（無ければ割り当てる）
+    python cleaning_duty.py --regenerate  # 今週の当番を組み直す
+
+場所 × 住人の「枠」のコスト表を作り、ハンガリアン法（O(n^3)）で総コスト最小の割り当てを求める。
+住人は ceil(場所数 / 人数) 個の枠に複製し、2枠目以降は高いコストにして担当数を均等にする。
+コストには直近の掃除記録（多くやっている人ほど後回し・同じ場所は避ける）と先週の当番（同じ場所を続けない）を入れる。
+候補は直近 HISTORY_DAYS 日に在宅状況か掃除記録がある人（一度だけ使った人は外れていく）。
+今日「外出」の人は、他に割り当てられる人がいる限り外す。
+"""
+from __future__ import annotations
+import argparse
+import logging
+import math
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from peewee import fn
+
+from clean_list import CLEAN_LOCATIONS
+from sqlite_db_presence import CleaningDuty, CleaningLog, PresenceLog, db, write_transaction
+from ui_builders import duty_week_start, invalidate_home_cache
+
+logger = logging.getLogger(__name__)
+
+TZ_JST = ZoneInfo("Asia/Tokyo")
+
+# コストの重み（枠の順番 > 先週と同じ場所 > 同じ場所の直近の回数 > 直近の掃除回数）
+SLOT_COST = 1000  # 2枠目以降（担当数を均等にする）
+REPEAT_LAST_WEEK_COST = 100  # 先週と同じ場所
+SAME_LOCATION_COST = 5  # 直近にその場所を掃除した回数あたり
+RECENT_LOAD_COST = 1  # 直近の掃除回数あたり
+# 直近とみなす日数（コストの集計と、住人とみなす期間）
+HISTORY_DAYS = 28
+
+# 割り当て済みの週（毎回 DB を見に行かないため）
+_assigned_weeks: set[date] = set()
+_assign_lock = threading.Lock()
+
+
+def _hungarian(cost: List[List[float]]) -> List[int]:
+    """
+    行数 <= 列数のコスト行列で、各行に別々の列を割り当てて総コストを最小にする（ポテンシャル付きハンガリアン法）。
+    返り値: 行ごとの列番号
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if n > m:
+        raise ValueError("rows must not exceed columns")
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # 列 j に割り当てた行（1始まり、0 は未割り当て）
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = match[j0], inf, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j], way[j] = cur, j0
+                if minv[j] < delta:
+                    delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # 増加路に沿って割り当てを入れ替える
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    result = [-1] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            result[match[j] - 1] = j - 1
+    return result
+
+
+def _candidate_residents(today: date, recent: Dict[Tuple[str, str], int]) -> List[str]:
+    """
+    割り当て候補: 直近 HISTORY_DAYS 日に在宅状況を登録したか掃除をした人（recent は _recent_counts の結果）。
+    今日「外出」の人は、他に誰かいる限り外す。在宅状況は date インデックスの範囲だけを読む
+    """
+    since = today - timedelta(days=HISTORY_DAYS)
+    presence = (
+        PresenceLog.select(PresenceLog.user, PresenceLog.date, PresenceLog.status)
+        .where(PresenceLog.date >= since)
+        .tuples()
+    )
+    active = {uid for uid, _loc in recent}
+    away = set()
+    for uid, day, status in presence:
+        active.add(uid)
+        if day == today and status == "away":
+            away.add(uid)
+    residents = sorted(active)
+    available = [uid for uid in residents if uid not in away]
+    return available or residents
+
+
+def _recent_counts() -> Dict[Tuple[str, str], int]:
+    """
+    直近 HISTORY_DAYS 日の (人, 場所) ごとの掃除回数を1回の GROUP BY で。
+    location IN (...) と timestamp の下限で (location, timestamp) インデックスの範囲だけを読む（履歴の件数によらない）
+    """
+    lower = datetime.utcnow() - timedelta(days=HISTORY_DAYS)
+    query = (
+        CleaningLog.select(CleaningLog.user, CleaningLog.location, fn.COUNT(CleaningLog.id))
+        .where(CleaningLog.location.in_(CLEAN_LOCATIONS) & (CleaningLog.timestamp >= lower))
+        .group_by(CleaningLog.user, CleaningLog.location)
+        .tuples()
+    )
+    return {(uid, loc): n for uid, loc, n in query}
+
+
+def _last_week_duties(week_start: date) -> set[Tuple[str, str]]:
+    prev = week_start - timedelta(days=7)
+    query = CleaningDuty.select(CleaningDuty.user, CleaningDuty.location).where(CleaningDuty.week_start == prev)
+    return set(query.tuples())
+
+
+def plan_duties(
+    locations: List[str],
+    residents: List[str],
+    recent: Dict[Tuple[str, str], int],
+    last_week: set[Tuple[str, str]],
+) -> Dict[str, str]:
+    """場所 -> 担当者（DB を使わない計算部分）。住人がいなければ空"""
+    if not locations or not residents:
+        return {}
+    load: Dict[str, int] = {}
+    for (uid, _loc), n in recent.items():
+        load[uid] = load.get(uid, 0) + n
+
+    # 住人を ceil(場所数 / 人数) 個の枠に複製（列 = (住人, 何枠目)）
+    slots_per_resident = math.ceil(len(locations) / len(residents))
+    columns = [(uid, k) for k in range(slots_per_resident) for uid in residents]
+    cost = [
+        [
+            SLOT_COST * k
+            + REPEAT_LAST_WEEK_COST * ((uid, loc) in last_week)
+            + SAME_LOCATION_COST * recent.get((uid, loc), 0)
+            + RECENT_LOAD_COST * load.get(uid, 0)
+            for uid, k in columns
+        ]
+        for loc in locations
+    ]
+    return {loc: columns[j][0] for loc, j in zip(locations, _hungarian(cost))}
+
+
+def assign_week(week_start: date, today: Optional[date] = None, replace: bool = False) -> List[CleaningDuty]:
+    """
+    week_start の週の当番を割り当てて保存する。既にあればそのまま返す（replace=True なら組み直す）。
+    同時に呼ばれても書き込みロックの中で確認するので、割り当ては1回だけ。
+    """
+    today = today or datetime.now(TZ_JST).date()
+    started = time.perf_counter()
+    with write_transaction():
+        existing = CleaningDuty.select().where(CleaningDuty.week_start == week_start).order_by(CleaningDuty.id)
+        if existing.exists() and not replace:
+            return list(existing)
+        CleaningDuty.delete().where(CleaningDuty.week_start == week_start).execute()
+        recent = _recent_counts()
+        plan = plan_duties(CLEAN_LOCATIONS, _candidate_residents(today, recent), recent, _last_week_duties(week_start))
+        if plan:
+            CleaningDuty.insert_many(
+                [{"user": uid, "week_start": week_start, "location": loc} for loc, uid in plan.items()]
+            ).execute()
+        rows = list(existing)
+    invalidate_home_cache()
+    logger.info(
+        "[duty] assigned %d locations for week %s in %.1fms", len(rows), week_start, (time.perf_counter() - started) * 1000
+    )
+    return rows
+
+
+def ensure_week_duties(today: Optional[date] = None) -> None:
+    """
+    今週の当番が無ければ割り当てる（割り当て済みの週は DB を見ない）。
+    住人がまだいない週は、読み取りだけで候補を確認し、いなければ書き込みロックを取らずに戻る
+    （在宅状況が登録されたあとに Home を開けば、その時点で割り当てる）
+    """
+    today = today or datetime.now(TZ_JST).date()
+    week_start = duty_week_start(today)
+    if week_start in _assigned_weeks:
+        return
+    with _assign_lock:
+        if week_start in _assigned_weeks:
+            return
+        exists = CleaningDuty.select().where(CleaningDuty.week_start == week_start).exists()
+        if not exists and not _candidate_residents(today, _recent_counts()):
+            return
+        if exists or assign_week(week_start, today):
+            _assigned_weeks.add(week_start)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="掃除当番の割り当て")
+    parser.add_argument("--regenerate", action="store_true", help="今週の当番を組み直す")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    db.create_tables([CleaningDuty])
+    today = datetime.now(TZ_JST).date()
+    week_start = duty_week_start(today)
+    rows = assign_week(week_start, today, replace=args.regenerate)
+    print(f"week {week_start}")
+    for r in rows:
+        print(f"  {r.location}: {r.user_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
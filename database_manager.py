@@ -1,38 +1,412 @@
 # database_manager.py
 from __future__ import annotations
-from typing import List, Tuple
+import logging
+import math
+import os
+import threading
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from dotenv import load_dotenv
+from rapidfuzz import fuzz, process
 from manuals_data import MANUALS_DATA
+from keyword_extractor import AhoCorasick, extract_terms, keyword_vocabulary, synonym_map
+from manuals_loader import ManualsWatcher, entry_hash, load_manuals_file
+from text_normalize import fold, fold_tokens
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# 検索バックエンド: "memory"（既定: プロセス内インデックス）/ "fts"（SQLite FTS5）
+MANUALS_BACKEND = os.getenv("MANUALS_BACKEND", "memory").strip().lower()
+# 外部マニュアルファイル（JSON/YAML）。指定時は MANUALS_DATA の代わりに読み込み、変更を監視する
+MANUALS_FILE = os.getenv("MANUALS_FILE", "").strip()
+
+# n-gram の最大長（日本語は空白で区切られないため文字 n-gram で索引する）
+_MAX_GRAM = 3
+
+# あいまい検索の重み（title > keywords > body）と足切りスコア
+_FIELD_WEIGHTS = (1.0, 0.9, 0.8)
+_FUZZY_CUTOFF = 60.0
+# 同義語展開した語の重み（元の語は 1.0）
+_SYNONYM_WEIGHT = 0.5
 
 
 def _norm(s: str) -> str:
     return (s or "").strip().lower()
 
 
+def _grams(s: str, n: int) -> set:
+    return {s[i : i + n] for i in range(len(s) - n + 1)}
+
+
+class _PreparedEntry:
+    """1項目分の索引材料（fold 済みフィールド）。n-gram は posting を作るときだけ計算し、保持しない"""
+
+    __slots__ = ("title", "keywords", "body", "hay")
+
+    def __init__(self, it: dict):
+        self.title = fold(it.get("title", ""))
+        self.keywords = fold(it.get("keywords", ""))
+        self.body = fold(it.get("body", ""))
+        self.hay = "\n".join([self.title, self.body, self.keywords])
+
+
+def _hay_grams(hay: str) -> set:
+    return {g for n in range(1, _MAX_GRAM + 1) for g in _grams(hay, n)}
+
+
+# 空き番号（削除された項目）がこれを超え、かつ項目数の半分を超えたら作り直して詰める
+_MAX_FREE_SLOTS = 16
+
+
+class _ManualIndex:
+    """
+    マニュアルの転置インデックス（1〜3文字 n-gram → 項目番号の集合）。
+    起動時に1回構築し、検索時は posting の積集合で候補を絞る。
+    各フィールドは構築時に fold() 済みなので、検索時はクエリを1回正規化するだけでよい。
+
+    previous を渡すと差分で更新する: 内容ハッシュが同じ項目は前回と同じ番号のまま残し、
+    削除・追加・変更された項目の n-gram の posting だけを作り直す（他の posting は前回のものを共有）。
+    検索中のリクエストが持つ前回のインデックスは書き換えない。
+    項目番号は入力順ではなく「枠」で、削除された枠は空き（entries[i] が None）になり、次の追加で再利用する。
+    """
+
+    def __init__(self, entries: List[dict], previous: Optional["_ManualIndex"] = None):
+        hashes = [entry_hash(it) for it in entries]
+        self.rebuilt = 0  # 新たに索引材料を作った項目数
+
+        prev_docs: Dict[str, _PreparedEntry] = {}
+        if previous is not None:
+            prev_docs = {h: doc for h, doc in zip(previous.hashes, previous.docs) if h is not None}
+        free = 0 if previous is None else previous.hashes.count(None)
+        if previous is None or free > max(_MAX_FREE_SLOTS, previous.size // 2):
+            self._build(entries, hashes, prev_docs)
+        else:
+            self._update(entries, hashes, previous)
+
+        self.size = len(entries)
+        # あいまい検索用: [title..., keywords..., body...] を1本のリストに並べておく（空き枠は ""）
+        self.fields: List[str] = []
+        for key in ("title", "keywords", "body"):
+            self.fields.extend(getattr(doc, key) if doc is not None else "" for doc in self.docs)
+        self.hays = [doc.hay if doc is not None else "" for doc in self.docs]
+
+        # タイトル昇順の並び順を事前計算
+        self.title_order = sorted(
+            (i for i, it in enumerate(self.entries) if it is not None),
+            key=lambda i: _norm(self.entries[i].get("title", "")),
+        )
+        self.rank = {i: r for r, i in enumerate(self.title_order)}
+
+    def _prepare(self, it: dict, h: str, reuse: Dict[str, _PreparedEntry]) -> _PreparedEntry:
+        doc = reuse.get(h)
+        if doc is None:
+            doc = reuse[h] = _PreparedEntry(it)
+            self.rebuilt += 1
+        return doc
+
+    def _build(self, entries: List[dict], hashes: List[str], reuse: Dict[str, _PreparedEntry]) -> None:
+        self.entries: List[Optional[dict]] = list(entries)
+        self.hashes: List[Optional[str]] = list(hashes)
+        self.docs: List[Optional[_PreparedEntry]] = [self._prepare(it, h, reuse) for it, h in zip(entries, hashes)]
+        postings: Dict[str, set] = {}
+        for i, doc in enumerate(self.docs):
+            for g in _hay_grams(doc.hay):
+                postings.setdefault(g, set()).add(i)
+        self.postings: Dict[str, FrozenSet[int]] = {g: frozenset(ids) for g, ids in postings.items()}
+
+    def _update(self, entries: List[dict], hashes: List[str], previous: "_ManualIndex") -> None:
+        # 前回と同じ内容の項目は同じ枠に残す（同じ内容が複数あれば1つずつ対応させる）
+        slots_by_hash: Dict[str, List[int]] = {}
+        for slot, h in enumerate(previous.hashes):
+            if h is not None:
+                slots_by_hash.setdefault(h, []).append(slot)
+        added: List[Tuple[dict, str]] = []
+        for it, h in zip(entries, hashes):
+            slots = slots_by_hash.get(h)
+            if slots:
+                slots.pop()
+            else:
+                added.append((it, h))
+        removed = sorted(slot for slots in slots_by_hash.values() for slot in slots)
+
+        self.entries = list(previous.entries)
+        self.hashes = list(previous.hashes)
+        self.docs = list(previous.docs)
+        self.postings = dict(previous.postings)
+        touched: Dict[str, set] = {}
+
+        def _edit(g: str) -> set:
+            ids = touched.get(g)
+            if ids is None:
+                ids = touched[g] = set(self.postings.get(g, ()))
+            return ids
+
+        for slot in removed:
+            for g in _hay_grams(self.docs[slot].hay):
+                _edit(g).discard(slot)
+            self.entries[slot] = self.hashes[slot] = self.docs[slot] = None
+
+        reuse = {h: doc for h, doc in zip(previous.hashes, previous.docs) if h is not None}
+        free_slots = [slot for slot, h in enumerate(self.hashes) if h is None]
+        free_slots.reverse()
+        for it, h in added:
+            doc = self._prepare(it, h, reuse)
+            if free_slots:
+                slot = free_slots.pop()
+                self.entries[slot], self.hashes[slot], self.docs[slot] = it, h, doc
+            else:
+                slot = len(self.entries)
+                self.entries.append(it)
+                self.hashes.append(h)
+                self.docs.append(doc)
+            for g in _hay_grams(doc.hay):
+                _edit(g).add(slot)
+
+        for g, ids in touched.items():
+            if ids:
+                self.postings[g] = frozenset(ids)
+            else:
+                self.postings.pop(g, None)
+
+    def _candidates(self, tok: str) -> FrozenSet[int]:
+        n = min(len(tok), _MAX_GRAM)
+        result = None
+        # 出現数の少ない gram から積集合を取る
+        for g in sorted(_grams(tok, n), key=lambda g: len(self.postings.get(g, ()))):
+            ids = self.postings.get(g)
+            if not ids:
+                return frozenset()
+            result = ids if result is None else result & ids
+            if not result:
+                return frozenset()
+        return result or frozenset()
+
+    def search(self, tokens: List[str]) -> List[int]:
+        """全トークンを含む項目番号をタイトル昇順で返す（AND マッチ）"""
+        cand = None
+        for tok in sorted(tokens, key=len, reverse=True):
+            ids = self._candidates(tok)
+            cand = ids if cand is None else cand & ids
+            if not cand:
+                return []
+        # n-gram の一致は部分文字列の一致を保証しないため、最後に候補だけ確認する
+        hits = [i for i in cand if all(tok in self.hays[i] for tok in tokens)]
+        hits.sort(key=self.rank.__getitem__)
+        return hits
+
+    def ranked(self, tokens: List[str], limit: int) -> List[Tuple[int, float]]:
+        """title/keywords/body をあいまい一致で採点し、スコア降順で (項目番号, スコア) を返す"""
+        n = len(self.entries)  # 枠の数（fields の並び）
+        # field_scores[f][i]: フィールド f・項目 i のトークン平均スコア
+        field_scores = [[0.0] * n for _ in _FIELD_WEIGHTS]
+        for tok in tokens:
+            # コーパス全体を1回の extract で採点（C 実装のバッチ処理）
+            for _choice, score, pos in process.extract(
+                tok, self.fields, scorer=fuzz.partial_ratio, limit=None, score_cutoff=_FUZZY_CUTOFF / 2
+            ):
+                field_scores[pos // n][pos % n] += score / len(tokens)
+
+        scored = []
+        for i in range(n):
+            weighted = [w * fs[i] for w, fs in zip(_FIELD_WEIGHTS, field_scores)]
+            best = max(weighted)
+            if best >= _FUZZY_CUTOFF:
+                scored.append((i, best, sum(weighted)))
+        # 最高スコア → 合計スコア → タイトル順
+        scored.sort(key=lambda x: (-x[1], -x[2], self.rank[x[0]]))
+        return [(i, best) for i, best, _total in scored[:limit]]
+
+    def any_of(self, terms: Dict[str, float], limit: int) -> List[Tuple[int, float]]:
+        """
+        いずれかの語を含む項目を、語の重み × 希少度（idf）× 出現フィールドの重みの合計で
+        順位付けする（OR 検索）。terms: {語: 重み}
+        """
+        n = len(self.entries)  # 枠の数（fields の並び）
+        scores: Dict[int, float] = {}
+        for term, term_w in terms.items():
+            ids = [i for i in self._candidates(term) if term in self.hays[i]]
+            if not ids:
+                continue
+            idf = math.log(1 + self.size / len(ids))
+            for i in ids:
+                if term in self.fields[i]:  # title
+                    w = _FIELD_WEIGHTS[0]
+                elif term in self.fields[n + i]:  # keywords
+                    w = _FIELD_WEIGHTS[1]
+                else:  # body
+                    w = _FIELD_WEIGHTS[2]
+                scores[i] = scores.get(i, 0.0) + term_w * idf * w
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], self.rank[x[0]]))
+        return ranked[:limit]
+
+
+def _initial_entries() -> List[dict]:
+    if MANUALS_FILE:
+        try:
+            return load_manuals_file(MANUALS_FILE)
+        except Exception:
+            logger.exception("[manuals] failed to load %s; falling back to MANUALS_DATA", MANUALS_FILE)
+    return list(MANUALS_DATA)
+
+
+_ENTRIES: List[dict] = _initial_entries()
+_RELOAD_LOCK = threading.Lock()
+_RELOAD_LISTENERS: List[Callable[[], None]] = []
+CORPUS_VERSION = 0  # 再読み込みのたびに +1
+
+if MANUALS_BACKEND == "fts":
+    import manual_fts
+
+    # コーパスは DB 側に持ち、プロセス内にはインデックスを作らない
+    manual_fts.sync_manuals(_ENTRIES)
+    _INDEX = None
+else:
+    _INDEX = _ManualIndex(_ENTRIES)
+# メンション文からのキーワード抽出用（keywords 列の語彙。バックエンドによらずプロセス内に持つ）
+_KEYWORDS = AhoCorasick(keyword_vocabulary(_ENTRIES))
+# keywords の共起から作った同義語グラフ（語 -> 同義語の集合）
+_SYNONYMS = synonym_map(_ENTRIES)
+
+
 def search_manuals_by_keyword(query: str) -> List[Tuple[str, str]]:
     """
     入力キーワード（空白区切り AND）で、title/body/keywords を横断検索。
     返り値: [(title, body), ...]
     """
-    q = _norm(query)
-    if not q:
+    if MANUALS_BACKEND == "fts":
+        return [(title, body) for title, body, _snip, _score in manual_fts.search(query)]
+
+    index = _INDEX
+    tokens = fold_tokens(query)
+    if not tokens:
         # 空ならタイトル昇順で全件
-        items = sorted(MANUALS_DATA, key=lambda x: _norm(x.get("title", "")))
-        return [(it.get("title", ""), it.get("body", "")) for it in items]
-
-    tokens = [t for t in q.split() if t]
-    hits = []
-    for it in MANUALS_DATA:
-        hay = "\n".join(
-            [
-                it.get("title", ""),
-                it.get("body", ""),
-                it.get("keywords", ""),
-            ]
-        ).lower()
-        # AND マッチ
-        if all(tok in hay for tok in tokens):
-            hits.append(it)
-
-    # タイトル昇順で整列
-    hits.sort(key=lambda x: _norm(x.get("title", "")))
-    return [(it.get("title", ""), it.get("body", "")) for it in hits]
+        ids = index.title_order
+    else:
+        ids = index.search(tokens)
+
+    return [(index.entries[i].get("title", ""), index.entries[i].get("body", "")) for i in ids]
+
+
+def search_manuals_ranked(query: str, limit: int = 10) -> List[Tuple[str, str, float]]:
+    """
+    あいまい一致で title > keywords > body の重みを付けて採点し、関連度順に上位 limit 件を返す。
+    返り値: [(title, body, score), ...]（score は 0〜100）
+    FTS バックエンドでは bm25 順（score は bm25 の符号反転値）。
+    """
+    if MANUALS_BACKEND == "fts":
+        return [(title, body, score) for title, body, _snip, score in manual_fts.search(query, limit)]
+
+    index = _INDEX
+    tokens = fold_tokens(query)
+    if not tokens:
+        return []
+    return [
+        (index.entries[i].get("title", ""), index.entries[i].get("body", ""), score)
+        for i, score in index.ranked(tokens, limit)
+    ]
+
+
+def extract_manual_keywords(text: str) -> List[str]:
+    """自由文（メンション）から、マニュアルの keywords に含まれる既知の語を1回の走査で抜き出す"""
+    return extract_terms(_KEYWORDS, text)
+
+
+def expand_synonyms(terms: List[str]) -> Dict[str, float]:
+    """語を同義語グラフで展開し {語: 重み} にする（元の語 1.0、同義語 _SYNONYM_WEIGHT）"""
+    synonyms = _SYNONYMS
+    weighted = {t: 1.0 for t in terms}
+    for t in terms:
+        for syn in synonyms.get(t, ()):
+            weighted.setdefault(syn, _SYNONYM_WEIGHT)
+    return weighted
+
+
+def search_manuals_by_terms(terms: List[str], limit: int = 10) -> List[Tuple[str, str, float]]:
+    """
+    語（と同義語）のいずれかを含む項目を関連度順に返す（OR 検索）。terms は fold 済みであること。
+    返り値: [(title, body, score), ...]
+    """
+    if not terms:
+        return []
+    weighted = expand_synonyms(terms)
+    if MANUALS_BACKEND == "fts":
+        return manual_fts.search_any(weighted, limit)
+
+    index = _INDEX
+    return [
+        (index.entries[i].get("title", ""), index.entries[i].get("body", ""), score)
+        for i, score in index.any_of(weighted, limit)
+    ]
+
+
+def search_manuals_for_mention(query: str, limit: int = 10) -> List[Tuple[str, str, float]]:
+    """
+    メンション文の検索。既知キーワードを抽出して OR 検索した結果を先に、
+    続けてあいまい検索の結果（重複除く）を並べる。
+    """
+    results = search_manuals_by_terms(extract_manual_keywords(query), limit)
+    seen = {title for title, _body, _score in results}
+    for title, body, score in search_manuals_ranked(query, limit):
+        if len(results) >= limit:
+            break
+        if title not in seen:
+            seen.add(title)
+            results.append((title, body, score))
+    return results
+
+
+def normalize_query(query: str) -> str:
+    """キャッシュキー用にクエリを正規化（fold() + 空白の畳み込み）"""
+    return " ".join(fold_tokens(query))
+
+
+def current_manuals() -> List[dict]:
+    """現在のマニュアル項目一覧"""
+    return _ENTRIES
+
+
+def add_reload_listener(fn: Callable[[], None]) -> None:
+    """コーパス差し替え後に呼ばれるコールバックを登録（検索キャッシュの破棄など）"""
+    _RELOAD_LISTENERS.append(fn)
+
+
+def _keywords_signature(entries: List[dict]) -> List[str]:
+    """項目の並びによらない keywords 列の一覧（語彙・同義語を作り直す必要があるかの判定用）"""
+    return sorted(it.get("keywords") or "" for it in entries)
+
+
+def reload_manuals(entries: List[dict]) -> None:
+    """
+    マニュアルを差し替える。新しいインデックスを裏で組み立ててから参照を入れ替えるため、
+    検索中のリクエストは古いインデックスのまま最後まで処理される。
+    インデックスは変更のあった項目の posting だけを更新する（_ManualIndex の previous）。
+    """
+    global _ENTRIES, _INDEX, _KEYWORDS, _SYNONYMS, CORPUS_VERSION
+    entries = list(entries)
+    with _RELOAD_LOCK:
+        if MANUALS_BACKEND == "fts":
+            changed = manual_fts.sync_manuals(entries)
+        else:
+            new_index = _ManualIndex(entries, previous=_INDEX)
+            changed = new_index.rebuilt
+            _INDEX = new_index
+        # 語彙と同義語は keywords だけから作るので、keywords が変わったときだけ作り直す
+        if _keywords_signature(entries) != _keywords_signature(_ENTRIES):
+            _KEYWORDS = AhoCorasick(keyword_vocabulary(entries))
+            _SYNONYMS = synonym_map(entries)
+        _ENTRIES = entries
+        CORPUS_VERSION += 1
+
+    logger.info("[manuals] reloaded %d entries (%d re-indexed)", len(entries), changed)
+    for fn in list(_RELOAD_LISTENERS):
+        try:
+            fn()
+        except Exception:
+            logger.exception("[manuals] reload listener failed")
+
+
+def start_manuals_watcher() -> Optional[ManualsWatcher]:
+    """MANUALS_FILE が指定されていれば変更監視スレッドを起動する"""
+    if not MANUALS_FILE:
+        return None
+    return ManualsWatcher(MANUALS_FILE, reload_manuals).start()
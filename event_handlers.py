@@ -1,6 +1,7 @@
 # event_handlers.py
 from __future__ import annotations
-from database_manager import search_manuals_by_keyword
+from search_cache import cursor_results, open_cursor
+from slack_dispatcher import PRIORITY_NORMAL, slack_call
 
 
 def register_event_handlers(app):
@@ -22,7 +23,9 @@ def register_event_handlers(app):
             say("こんにちは！ 検索したいキーワードをメンション付きで送ってください（例：`@bot ごみ出し`）。")
             return
 
-        results = search_manuals_by_keyword(query)
+        # 文中の既知キーワードを抽出して関連度順に検索（先頭が最も近い回答）。
+        # 結果セットはカーソルとしてキャッシュし、ページ送りで再検索しない
+        cursor, results = open_cursor(query, mode="mention")
         if not results:
             say(text=f"'{query}' に一致するマニュアルは見つかりませんでした。")
             return
@@ -37,7 +40,7 @@ def register_event_handlers(app):
                         "type": "button",
                         "text": {"type": "plain_text", "text": "次の結果"},
                         "action_id": "next_manual",
-                        "value": f"0|{query}",
+                        "value": f"0|{cursor}",
                     }
                 ],
             },
@@ -49,10 +52,10 @@ def register_event_handlers(app):
         ack()
         try:
             value = body["actions"][0]["value"]
-            index_str, query = value.split("|", 1)
+            index_str, cursor = value.split("|", 1)
             index = int(index_str) + 1
 
-            results = search_manuals_by_keyword(query)
+            results = cursor_results(cursor)
             # payload から channel/ts を安全に取得
             channel_id = (body.get("channel") or {}).get("id") or (body.get("container") or {}).get(
                 "channel_id"
@@ -65,8 +68,23 @@ def register_event_handlers(app):
                 logger.warning("next_manual: channel_id/message_ts が取得できませんでした")
                 return
 
+            if results is None:
+                slack_call(
+                    client,
+                    "chat_update",
+                    priority=PRIORITY_NORMAL,
+                    channel=channel_id,
+                    ts=message_ts,
+                    text="検索結果の有効期限が切れました。もう一度メンションで検索してください。",
+                    blocks=[],
+                )
+                return
+
             if index >= len(results):
-                client.chat_update(
+                slack_call(
+                    client,
+                    "chat_update",
+                    priority=PRIORITY_NORMAL,
                     channel=channel_id, ts=message_ts, text="これ以上の検索結果はありません。", blocks=[]
                 )
                 return
@@ -81,12 +99,15 @@ def register_event_handlers(app):
                             "type": "button",
                             "text": {"type": "plain_text", "text": "次の結果"},
                             "action_id": "next_manual",
-                            "value": f"{index}|{query}",
+                            "value": f"{index}|{cursor}",
                         }
                     ],
                 },
             ]
-            client.chat_update(
+            slack_call(
+                client,
+                "chat_update",
+                priority=PRIORITY_NORMAL,
                 channel=channel_id, ts=message_ts, text=f"{title} - {body_text}", blocks=blocks
             )
         except Exception as e:
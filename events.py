@@ -1,7 +1,9 @@
 # events.py
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from sqlite_db_presence import db, User, Event
+from sqlite_db_presence import User, Event, write_transaction
+from lazy_listeners import lazy_task
+from slack_dispatcher import PRIORITY_MODAL, slack_call
 
 JST = ZoneInfo("Asia/Tokyo")
 UTC = ZoneInfo("UTC")
@@ -32,6 +34,50 @@ def _event_pk_value(ev) -> str:
     return str(_ev_pk(ev))
 
 
+def _parse_event_form(state: dict, title_limit: int | None = None) -> tuple[dict, dict]:
+    """
+    予定モーダルの入力を取り出して検証する。
+    返り値: (Event の列値, errors)。errors が空でなければ values は不完全。
+    """
+    title = state["title_block"]["event_title"]["value"]
+    date_str = state["date_block"]["event_date"]["selected_date"]
+    start_str = state["start_block"]["start_time"]["selected_time"]
+    end_str = state["end_block"]["end_time"]["selected_time"]
+    location = state.get("location_block", {}).get("event_location", {}).get("value")
+    memo = state.get("memo_block", {}).get("event_memo", {}).get("value")
+
+    errors = {}
+    if not title or not title.strip():
+        errors["title_block"] = "タイトルは必須です。"
+    elif title_limit is not None and len(title) > title_limit:
+        errors["title_block"] = f"タイトルは{title_limit}文字以内にしてください。"
+
+    start_utc = end_utc = None
+    try:
+        start_utc = jst_to_utc_naive(date_str, start_str)
+        end_utc = jst_to_utc_naive(date_str, end_str)
+        if end_utc <= start_utc:
+            errors["end_block"] = "終了は開始より後にしてください。"
+    except Exception:
+        errors.setdefault("date_block", "日付を選択してください。")
+        errors.setdefault("start_block", "開始時刻を選択してください。")
+        errors.setdefault("end_block", "終了時刻を選択してください。")
+
+    if location and len(location) > 40:
+        errors["location_block"] = "場所は40文字以内にしてください。"
+    if memo and len(memo) > 200:
+        errors["memo_block"] = "メモは200文字以内にしてください。"
+
+    values = {
+        "title": (title or "").strip(),
+        "start_at": start_utc,
+        "end_at": end_utc,
+        "location": (location.strip() if location else None),
+        "memo": (memo.strip() if memo else None),
+    }
+    return values, errors
+
+
 def build_event_create_modal_view() -> dict:
     return {
         "type": "modal",
@@ -156,60 +202,41 @@ def register_events(app):
     @app.action("open_event_create")
     def open_event_create(ack, body, client, logger):
         ack()
-        client.views_open(trigger_id=body["trigger_id"], view=build_event_create_modal_view())
+        slack_call(
+            client,
+            "views_open",
+            priority=PRIORITY_MODAL,
+            trigger_id=body["trigger_id"],
+            view=build_event_create_modal_view(),
+        )
+
+    # 入力チェックと ack だけ即時に行い、DB 書き込みと Home 更新は lazy listener で行う
+    def _ack_event_create(ack, body):
+        _values, errors = _parse_event_form(body["view"]["state"]["values"], title_limit=30)
+        if errors:
+            ack(response_action="errors", errors=errors)
+            return
+        ack()
 
-    @app.view("event_create_modal")
-    def handle_event_create(ack, body, client, logger):
-        from ui_builders import build_home_blocks  # 循環参照回避のためローカルimport
+    @lazy_task
+    def handle_event_create(body, client, logger, context):
+        from ui_builders import invalidate_home_cache  # 循環参照回避のためローカルimport
+        from home_publisher import fan_out_home, publish_home
 
         user_id = body["user"]["id"]
-        state = body["view"]["state"]["values"]
-
-        title = state["title_block"]["event_title"]["value"]
-        date_str = state["date_block"]["event_date"]["selected_date"]
-        start_str = state["start_block"]["start_time"]["selected_time"]
-        end_str = state["end_block"]["end_time"]["selected_time"]
-        location = state.get("location_block", {}).get("event_location", {}).get("value")
-        memo = state.get("memo_block", {}).get("event_memo", {}).get("value")
-
-        errors = {}
-        if not title or not title.strip():
-            errors["title_block"] = "タイトルは必須です。"
-        elif len(title) > 30:
-            errors["title_block"] = "タイトルは30文字以内にしてください。"
-
-        try:
-            start_utc = jst_to_utc_naive(date_str, start_str)
-            end_utc = jst_to_utc_naive(date_str, end_str)
-            if end_utc <= start_utc:
-                errors["end_block"] = "終了は開始より後にしてください。"
-        except Exception:
-            errors.setdefault("date_block", "日付を選択してください。")
-            errors.setdefault("start_block", "開始時刻を選択してください。")
-            errors.setdefault("end_block", "終了時刻を選択してください。")
-
-        if location and len(location) > 40:
-            errors["location_block"] = "場所は40文字以内にしてください。"
-        if memo and len(memo) > 200:
-            errors["memo_block"] = "メモは200文字以内にしてください。"
-
+        values, errors = _parse_event_form(body["view"]["state"]["values"], title_limit=30)
         if errors:
-            ack(response_action="errors", errors=errors)
             return
 
-        ack()
         user_obj, _ = User.get_or_create(slack_user_id=user_id)
-        with db.atomic():
-            Event.create(
-                title=title.strip(),
-                start_at=start_utc,
-                end_at=end_utc,
-                created_by=user_obj,
-                location=(location.strip() if location else None),
-                memo=(memo.strip() if memo else None),
-            )
+        with write_transaction():
+            Event.create(created_by=user_obj, **values)
+        invalidate_home_cache()
+
+        publish_home(client, user_id)
+        fan_out_home(client, exclude=user_id)
 
-        client.views_publish(user_id=user_id, view={"type": "home", "blocks": build_home_blocks(client)})
+    app.view("event_create_modal")(ack=_ack_event_create, lazy=[handle_event_create])
 
     @app.action("event_edit_btn")
     def on_event_edit(ack, body, client, logger):
@@ -221,73 +248,69 @@ def register_events(app):
             except Event.DoesNotExist:
                 logger.warning(f"event_edit_btn: Event not found (pk={event_pk})")
                 return
-            client.views_open(trigger_id=body["trigger_id"], view=build_event_edit_modal_view(ev))
+            slack_call(
+                client,
+                "views_open",
+                priority=PRIORITY_MODAL,
+                trigger_id=body["trigger_id"],
+                view=build_event_edit_modal_view(ev),
+            )
         except Exception:
             logger.exception("event_edit_btn failed")
 
-    @app.view("event_edit_modal")
-    def handle_event_edit(ack, body, client, logger):
-        from ui_builders import build_home_blocks
+    def _ack_event_edit(ack, body):
+        _values, errors = _parse_event_form(body["view"]["state"]["values"])
+        if errors:
+            ack(response_action="errors", errors=errors)
+            return
+        ack()
+
+    @lazy_task
+    def handle_event_edit(body, client, logger, context):
+        from ui_builders import invalidate_home_cache
+        from home_publisher import fan_out_home, publish_home
 
         user_id = body["user"]["id"]
-        state = body["view"]["state"]["values"]
         event_pk = int(body["view"]["private_metadata"])  # 文字列→int
-
-        title = state["title_block"]["event_title"]["value"]
-        date_str = state["date_block"]["event_date"]["selected_date"]
-        start_str = state["start_block"]["start_time"]["selected_time"]
-        end_str = state["end_block"]["end_time"]["selected_time"]
-        location = state.get("location_block", {}).get("event_location", {}).get("value")
-        memo = state.get("memo_block", {}).get("event_memo", {}).get("value")
-
-        errors = {}
-        if not title or not title.strip():
-            errors["title_block"] = "タイトルは必須です。"
-
-        try:
-            start_utc = jst_to_utc_naive(date_str, start_str)
-            end_utc = jst_to_utc_naive(date_str, end_str)
-            if end_utc <= start_utc:
-                errors["end_block"] = "終了は開始より後にしてください。"
-        except Exception:
-            errors.setdefault("date_block", "日付を選択してください。")
-            errors.setdefault("start_block", "開始時刻を選択してください。")
-            errors.setdefault("end_block", "終了時刻を選択してください。")
-
-        if location and len(location) > 40:
-            errors["location_block"] = "場所は40文字以内にしてください。"
-        if memo and len(memo) > 200:
-            errors["memo_block"] = "メモは200文字以内にしてください。"
-
+        values, errors = _parse_event_form(body["view"]["state"]["values"])
         if errors:
-            ack(response_action="errors", errors=errors)
             return
 
-        ack()
         try:
-            with db.atomic():
+            with write_transaction():
                 ev = Event.get_by_id(event_pk)
-                ev.title = title.strip()
-                ev.start_at = start_utc
-                ev.end_at = end_utc
-                ev.location = location.strip() if location else None
-                ev.memo = memo.strip() if memo else None
+                ev.title = values["title"]
+                ev.start_at = values["start_at"]
+                ev.end_at = values["end_at"]
+                ev.location = values["location"]
+                ev.memo = values["memo"]
                 ev.save()  # _meta/id に触れず保存
+            invalidate_home_cache()
         except Exception:
             logger.exception("event_edit_modal: update failed")
 
-        client.views_publish(user_id=user_id, view={"type": "home", "blocks": build_home_blocks(client)})
+        publish_home(client, user_id)
+        fan_out_home(client, exclude=user_id)
 
-    @app.action("event_delete_btn")
-    def on_event_delete(ack, body, client, logger):
-        from ui_builders import build_home_blocks
+    app.view("event_edit_modal")(ack=_ack_event_edit, lazy=[handle_event_edit])
 
+    def _ack_event_delete(ack):
         ack()  # 先にACK
+
+    @lazy_task
+    def on_event_delete(body, client, logger, context):
+        from ui_builders import invalidate_home_cache
+        from home_publisher import fan_out_home, publish_home
+
         try:
             user_id = body["user"]["id"]
             event_pk = int(body["actions"][0]["value"])  # 文字列→int
-            with db.atomic():
+            with write_transaction():
                 Event.delete_by_id(event_pk)  # _meta/id を直接参照しない安全な削除
-            client.views_publish(user_id=user_id, view={"type": "home", "blocks": build_home_blocks(client)})
+            invalidate_home_cache()
+            publish_home(client, user_id)
+            fan_out_home(client, exclude=user_id)
         except Exception:
             logger.exception("event_delete_btn failed")
+
+    app.action("event_delete_btn")(ack=_ack_event_delete, lazy=[on_event_delete])
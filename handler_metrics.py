@@ -0,0 +1,354 @@
+# handler_metrics.py
+"""
+リスナーごとの計測（action_id / callback_id / event type 単位）。
+
+    app = App(token=..., listener_executor=listener_executor())
+    register_handler_metrics(app)  # app.dispatch を計測付きに包む
+    register_handler_metrics_async(async_app)  # AsyncApp は async_dispatch を包む
+
+- 全体の処理時間（ack 関数と lazy 関数がすべて終わるまで）と ack までの時間をヒストグラムで集計
+- SQL の回数と合計時間、Slack API の呼び出し回数（slack_dispatcher 経由）を合計
+- 書き込みロックの待ち時間（sqlite_db_presence.write_transaction）も要約とエンドポイントに出す
+- 定期的にログへ要約を出し、METRICS_PORT を指定すると Prometheus 形式で公開（127.0.0.1 のみ）
+
+リスナーは別スレッドで動くので、計測中のリクエストは ContextVar で持ち回る。
+listener_executor() はスレッドへ投入するときに ContextVar を引き継ぐ Executor を返す
+（リスナーごとの DB 接続の開閉 connection_scope もここで行う）。
+asyncio 版では、リクエスト中に作られたタスク（ack 関数・lazy 関数）が参照を持ち、
+run_in_db / SyncListenerBridge のスレッドと slack_call_async へは ContextVar がそのまま引き継がれる。
+"""
+from __future__ import annotations
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from sqlite_db_presence import add_query_observer, connection_scope, lock_wait_stats
+
+logger = logging.getLogger(__name__)
+
+# 集計をログに出す間隔（秒）
+METRICS_LOG_INTERVAL_SEC = 300
+# Prometheus 形式のエンドポイント（未指定なら起動しない）
+METRICS_PORT = os.getenv("METRICS_PORT")
+# ヒストグラムの区切り（秒）
+LATENCY_BUCKETS_SEC = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bolt の既定と同じスレッド数
+LISTENER_WORKERS = 5
+
+
+def listener_key(body: dict) -> str:
+    """リクエストを計測の単位（action:xxx / view:xxx / event:xxx など）にまとめる"""
+    kind = body.get("type")
+    if kind == "block_actions":
+        actions = body.get("actions") or [{}]
+        return f"action:{actions[0].get('action_id', '?')}"
+    if kind in ("view_submission", "view_closed"):
+        return f"view:{(body.get('view') or {}).get('callback_id', '?')}"
+    if kind == "event_callback":
+        return f"event:{(body.get('event') or {}).get('type', '?')}"
+    if body.get("command"):
+        return f"command:{body['command']}"
+    if kind in ("shortcut", "message_action"):
+        return f"shortcut:{body.get('callback_id', '?')}"
+    return kind or "unknown"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_SEC) + 1)  # 最後は +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, upper in enumerate(LATENCY_BUCKETS_SEC):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """バケット上限による近似値"""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts[:-1]):
+            seen += n
+            if seen >= target:
+                return LATENCY_BUCKETS_SEC[i]
+        return float("inf")
+
+
+class _ListenerStats:
+    __slots__ = ("wall", "ack", "sql_queries", "sql_sec", "slack_calls")
+
+    def __init__(self):
+        self.wall = _Histogram()
+        self.ack = _Histogram()
+        self.sql_queries = 0
+        self.sql_sec = 0.0
+        self.slack_calls = 0
+
+
+class _Span:
+    """1リクエスト分の計測。ack 待ちと各リスナー実行が参照を持ち、最後に手放した側が記録する"""
+
+    __slots__ = ("key", "started", "ack_sec", "sql_queries", "sql_sec", "slack_calls", "_refs", "_lock")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.started = time.perf_counter()
+        self.ack_sec: Optional[float] = None
+        self.sql_queries = 0
+        self.sql_sec = 0.0
+        self.slack_calls = 0
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._refs += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._refs -= 1
+            done = self._refs == 0
+        if done:
+            _record(self, time.perf_counter() - self.started)
+
+
+_current: contextvars.ContextVar[Optional[_Span]] = contextvars.ContextVar("handler_span", default=None)
+_stats: Dict[str, _ListenerStats] = {}
+_lock = threading.Lock()
+_last_logged = time.monotonic()
+
+
+def _record(span: _Span, wall_sec: float) -> None:
+    global _last_logged
+    with _lock:
+        st = _stats.get(span.key)
+        if st is None:
+            st = _stats[span.key] = _ListenerStats()
+        st.wall.observe(wall_sec)
+        if span.ack_sec is not None:
+            st.ack.observe(span.ack_sec)
+        st.sql_queries += span.sql_queries
+        st.sql_sec += span.sql_sec
+        st.slack_calls += span.slack_calls
+
+        now = time.monotonic()
+        if now - _last_logged < METRICS_LOG_INTERVAL_SEC:
+            return
+        _last_logged = now
+        summary = "; ".join(
+            f"{key} n={s.wall.count} p50={s.wall.quantile(0.5) * 1000:.0f}ms p95={s.wall.quantile(0.95) * 1000:.0f}ms "
+            f"ack_p95={s.ack.quantile(0.95) * 1000:.0f}ms sql={s.sql_queries / s.wall.count:.1f}/req "
+            f"sql_ms={s.sql_sec / s.wall.count * 1000:.1f}/req slack={s.slack_calls / s.wall.count:.1f}/req"
+            for key, s in sorted(_stats.items())
+        )
+    waits = lock_wait_stats()
+    avg_wait = waits["total_sec"] / waits["count"] if waits["count"] else 0.0
+    logger.info(
+        "[metrics] %s; db_lock_wait n=%d avg=%.1fms max=%.0fms",
+        summary,
+        waits["count"],
+        avg_wait * 1000,
+        waits["max_sec"] * 1000,
+    )
+
+
+def _on_query(_sql, _params, elapsed: float) -> None:
+    span = _current.get()
+    if span is not None:
+        with span._lock:
+            span.sql_queries += 1
+            span.sql_sec += elapsed
+
+
+def count_slack_call() -> None:
+    """Slack API を1回呼んだことを計測中のリクエストに加える"""
+    span = _current.get()
+    if span is not None:
+        with span._lock:
+            span.slack_calls += 1
+
+
+class _SpanExecutor(ThreadPoolExecutor):
+    """投入元の ContextVar（計測中のリクエスト）を引き継ぎ、DB 接続の開閉で囲んでリスナーを実行する"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        ctx = contextvars.copy_context()
+        span = ctx.get(_current)
+        if span is not None:
+            span.acquire()
+
+        def run():
+            try:
+                with connection_scope():
+                    return ctx.run(fn, *args, **kwargs)
+            finally:
+                if span is not None:
+                    span.release()
+
+        return super().submit(run)
+
+
+def listener_executor(max_workers: int = LISTENER_WORKERS) -> ThreadPoolExecutor:
+    """App(listener_executor=...) に渡す Executor"""
+    return _SpanExecutor(max_workers=max_workers, thread_name_prefix="listener")
+
+
+def register_handler_metrics(app) -> None:
+    """
+    App.dispatch を計測付きに差し替える（METRICS_PORT があればエンドポイントも起動）。
+    同期版 Bolt のミドルウェアは入れ子で呼ばれない（next() の後でリスナーが動く）ため、
+    リスナーの実行まで囲めるグローバルの入口として dispatch を包む。
+    """
+    add_query_observer(_on_query)
+    dispatch = app.dispatch
+
+    @functools.wraps(dispatch)
+    def _measured_dispatch(req):
+        span = _Span(listener_key(req.body))
+        token = _current.set(span)
+        try:
+            # Socket Mode では ack されたところで戻る（リスナー本体は別スレッドで続く）
+            return dispatch(req)
+        finally:
+            span.ack_sec = time.perf_counter() - span.started
+            _current.reset(token)
+            span.release()
+
+    app.dispatch = _measured_dispatch
+
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+
+
+def _span_task_factory(loop, coro, **kwargs):
+    """計測中のリクエストの中で作られたタスクが終わるまで、そのリクエストの計測を閉じない"""
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    span = _current.get()
+    if span is not None:
+        span.acquire()
+        task.add_done_callback(lambda _task: span.release())
+    return task
+
+
+def register_handler_metrics_async(app) -> None:
+    """
+    register_handler_metrics の asyncio 版（AsyncApp.async_dispatch を包む）。
+    AsyncApp は ack 関数・lazy 関数をタスクで動かすので、イベントループのタスク生成に参照の取得を差し込む。
+    """
+    add_query_observer(_on_query)
+    dispatch = app.async_dispatch
+
+    @functools.wraps(dispatch)
+    async def _measured_dispatch(req):
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is not _span_task_factory:
+            loop.set_task_factory(_span_task_factory)
+        span = _Span(listener_key(req.body))
+        token = _current.set(span)
+        try:
+            # ack されたところで戻る（リスナー本体・lazy 関数はタスクで続く）
+            return await dispatch(req)
+        finally:
+            span.ack_sec = time.perf_counter() - span.started
+            _current.reset(token)
+            span.release()
+
+    app.async_dispatch = _measured_dispatch
+
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+
+
+def handler_stats() -> Dict[str, dict]:
+    """リスナーごとの集計のコピー"""
+    with _lock:
+        return {
+            key: {
+                "count": s.wall.count,
+                "wall_p50_sec": s.wall.quantile(0.5),
+                "wall_p95_sec": s.wall.quantile(0.95),
+                "ack_p95_sec": s.ack.quantile(0.95),
+                "sql_queries": s.sql_queries,
+                "sql_sec": s.sql_sec,
+                "slack_calls": s.slack_calls,
+            }
+            for key, s in _stats.items()
+        }
+
+
+def _prom_histogram(name: str, key: str, h: _Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for upper, n in zip(LATENCY_BUCKETS_SEC, h.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{listener="{key}",le="{upper}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{listener="{key}",le="+Inf"}} {h.count}')
+    lines.append(f'{name}_sum{{listener="{key}"}} {h.total:.6f}')
+    lines.append(f'{name}_count{{listener="{key}"}} {h.count}')
+    return lines
+
+
+def render_prometheus() -> str:
+    """Prometheus のテキスト形式で集計を返す"""
+    lines = [
+        "# TYPE house_handler_duration_seconds histogram",
+        "# TYPE house_handler_ack_seconds histogram",
+        "# TYPE house_handler_sql_queries_total counter",
+        "# TYPE house_handler_sql_seconds_total counter",
+        "# TYPE house_handler_slack_calls_total counter",
+        "# TYPE house_db_lock_waits_total counter",
+        "# TYPE house_db_lock_wait_seconds_total counter",
+        "# TYPE house_db_lock_wait_max_seconds gauge",
+    ]
+    with _lock:
+        for key, s in sorted(_stats.items()):
+            key = key.replace("\\", "\\\\").replace('"', '\\"')
+            lines += _prom_histogram("house_handler_duration_seconds", key, s.wall)
+            lines += _prom_histogram("house_handler_ack_seconds", key, s.ack)
+            lines.append(f'house_handler_sql_queries_total{{listener="{key}"}} {s.sql_queries}')
+            lines.append(f'house_handler_sql_seconds_total{{listener="{key}"}} {s.sql_sec:.6f}')
+            lines.append(f'house_handler_slack_calls_total{{listener="{key}"}} {s.slack_calls}')
+    waits = lock_wait_stats()
+    lines.append(f"house_db_lock_waits_total {waits['count']}")
+    lines.append(f"house_db_lock_wait_seconds_total {waits['total_sec']:.6f}")
+    lines.append(f"house_db_lock_wait_max_seconds {waits['max_sec']:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """127.0.0.1:port/metrics で集計を公開するスレッドを起動"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("[metrics] serving on http://127.0.0.1:%d/metrics", port)
+    return server
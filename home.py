@@ -1,12 +1,29 @@
 # home.py
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from sqlite_db_presence import PresenceLog
-from ui_builders import build_home_blocks
+from sqlite_db_presence import PresenceLog, run_in_db
+from home_publisher import publish_home, publish_home_async
+from cleaning_duty import ensure_week_duties
 
 
 def register_home(app):
     @app.event("app_home_opened")
     def on_home_opened(event, client, logger):
         user_id = event["user"]
-        client.views_publish(user_id=user_id, view={"type": "home", "blocks": build_home_blocks(client)})
+        # 週が替わって最初に開いた人のタイミングで今週の掃除当番を割り当てる
+        try:
+            ensure_week_duties()
+        except Exception:
+            logger.exception("[duty] weekly assignment failed")
+        publish_home(client, user_id)
+
+
+def register_home_async(app):
+    """asyncio 版（AsyncApp）。描画は DB スレッド、views.publish は await で送る"""
+    @app.event("app_home_opened")
+    async def on_home_opened(event, client, logger):
+        try:
+            await run_in_db(ensure_week_duties)
+        except Exception:
+            logger.exception("[duty] weekly assignment failed")
+        await publish_home_async(client, event["user"])
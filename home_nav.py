@@ -1,6 +1,7 @@
 # nav.py
 def register_nav(app):
-    from ui_builders import build_home_blocks
+    from home_publisher import publish_home
+    from ui_builders import AID_EVENTS_FIRST, AID_EVENTS_MORE, decode_event_cursor
 
     def _handle_week_nav(ack, body, client, logger):
         ack()
@@ -11,10 +12,7 @@ def register_nav(app):
             logger.warning(f"[week_nav] invalid value: {body['actions'][0].get('value')} ({e})")
             new_offset = 0
 
-        client.views_publish(
-            user_id=user_id,
-            view={"type": "home", "blocks": build_home_blocks(client, week_offset_days=new_offset)},
-        )
+        publish_home(client, user_id, week_offset_days=new_offset)
 
     @app.action("week_nav_prev")
     def week_nav_prev(ack, body, client, logger):
@@ -27,3 +25,23 @@ def register_nav(app):
     @app.action("week_nav_next")
     def week_nav_next(ack, body, client, logger):
         _handle_week_nav(ack, body, client, logger)
+
+    def _handle_events_page(ack, body, client, logger):
+        ack()
+        user_id = body["user"]["id"]
+        value = body["actions"][0].get("value")
+        try:
+            offset, cursor = decode_event_cursor(value)
+        except Exception as e:
+            logger.warning(f"[events_page] invalid value: {value} ({e})")
+            offset, cursor = 0, None
+
+        publish_home(client, user_id, week_offset_days=offset, cursor=cursor)
+
+    @app.action(AID_EVENTS_MORE)
+    def week_events_more(ack, body, client, logger):
+        _handle_events_page(ack, body, client, logger)
+
+    @app.action(AID_EVENTS_FIRST)
+    def week_events_first(ack, body, client, logger):
+        _handle_events_page(ack, body, client, logger)
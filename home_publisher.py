@@ -0,0 +1,136 @@
+# home_publisher.py
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from slack_dispatcher import PRIORITY_BACKGROUND, PRIORITY_NORMAL, slack_call, slack_call_async
+from sqlite_db_presence import run_in_db
+from ui_builders import BID_HOME_RENDERED_AT, EventCursor, build_home_blocks
+
+logger = logging.getLogger(__name__)
+
+# 最近 Home を開いた人を「閲覧中」とみなす時間（秒）
+ACTIVE_VIEWER_TTL_SEC = 30 * 60
+# 再配信のワーカー数（送信レートは slack_dispatcher が views.publish の Tier に合わせて抑える）
+FANOUT_WORKERS = 4
+
+# 内容比較で無視するブロック（描画時刻など）
+VOLATILE_BLOCK_IDS = {BID_HOME_RENDERED_AT}
+
+# user_id -> (最終閲覧時刻, 見ていた週オフセット, 予定一覧のページ)
+_viewers: dict[str, tuple[float, int, EventCursor]] = {}
+# user_id -> 最後に公開した Home のハッシュ
+_published_hash: dict[str, str] = {}
+_pending: set[str] = set()
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="home-fanout")
+
+
+def track_home_viewer(user_id: str, week_offset_days: int = 0, cursor: EventCursor = None) -> None:
+    """Home を開いた（表示中の）ユーザーを記録"""
+    with _lock:
+        _viewers[user_id] = (time.monotonic(), week_offset_days, cursor)
+
+
+def active_home_viewers() -> dict[str, tuple[int, EventCursor]]:
+    """閲覧中のユーザー -> (週オフセット, 予定一覧のページ)（期限切れは掃除する）"""
+    cutoff = time.monotonic() - ACTIVE_VIEWER_TTL_SEC
+    with _lock:
+        for uid in [u for u, (seen, _off, _cur) in _viewers.items() if seen < cutoff]:
+            del _viewers[uid]
+        return {uid: (off, cur) for uid, (_seen, off, cur) in _viewers.items()}
+
+
+def _view_hash(blocks: list) -> str:
+    stable = [b for b in blocks if b.get("block_id") not in VOLATILE_BLOCK_IDS]
+    raw = json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _publish_if_changed(
+    client, user_id: str, week_offset_days: int, cursor: EventCursor = None, priority: int = PRIORITY_NORMAL
+) -> bool:
+    """前回公開した内容と同じなら views.publish を省略する。返り値: 公開したら True"""
+    blocks = build_home_blocks(client, week_offset_days=week_offset_days, cursor=cursor)
+    digest = _view_hash(blocks)
+    with _lock:
+        if _published_hash.get(user_id) == digest:
+            return False
+    resp = slack_call(
+        client,
+        "views_publish",
+        priority=priority,
+        coalesce_key=("views_publish", user_id),
+        user_id=user_id,
+        view={"type": "home", "blocks": blocks},
+    )
+    if resp is None:
+        # 送信待ちの間に新しい内容に差し替えられた（記録はそちらの呼び出しで行う）
+        return False
+    # 成功したときだけ記録（失敗したら次回は必ず送る）
+    with _lock:
+        _published_hash[user_id] = digest
+    return True
+
+
+def publish_home(client, user_id: str, week_offset_days: int = 0, cursor: EventCursor = None) -> bool:
+    """
+    ユーザーの Home を描画（共有スナップショット）して公開し、閲覧中として記録する。
+    表示内容が前回と同じなら送信しない。返り値: 公開したら True
+    """
+    track_home_viewer(user_id, week_offset_days, cursor)
+    return _publish_if_changed(client, user_id, week_offset_days, cursor)
+
+
+async def publish_home_async(client, user_id: str, week_offset_days: int = 0, cursor: EventCursor = None) -> bool:
+    """publish_home の asyncio 版（client は AsyncWebClient）。描画は DB スレッド、送信は送信キュー経由"""
+    track_home_viewer(user_id, week_offset_days, cursor)
+    blocks = await run_in_db(build_home_blocks, client, week_offset_days=week_offset_days, cursor=cursor)
+    digest = _view_hash(blocks)
+    with _lock:
+        if _published_hash.get(user_id) == digest:
+            return False
+    resp = await slack_call_async(
+        client,
+        "views_publish",
+        coalesce_key=("views_publish", user_id),
+        user_id=user_id,
+        view={"type": "home", "blocks": blocks},
+    )
+    if resp is None:
+        return False
+    with _lock:
+        _published_hash[user_id] = digest
+    return True
+
+
+def _republish(client, user_id: str, week_offset_days: int, cursor: EventCursor) -> None:
+    with _lock:
+        _pending.discard(user_id)
+    try:
+        _publish_if_changed(client, user_id, week_offset_days, cursor, priority=PRIORITY_BACKGROUND)
+    except Exception:
+        logger.exception("[home] fan-out publish failed: %s", user_id)
+
+
+def fan_out_home(client, exclude: str | None = None) -> int:
+    """
+    書き込み後、閲覧中の全員の Home を裏で再配信する。
+    描画は共有スナップショットなので1回、送信は低い優先度で送信キューに積む。
+    既に再配信待ちのユーザーは積み増さない。返り値: 投入した件数
+    """
+    submitted = 0
+    for uid, (offset, cursor) in active_home_viewers().items():
+        if uid == exclude:
+            continue
+        with _lock:
+            if uid in _pending:
+                continue
+            _pending.add(uid)
+        _executor.submit(_republish, client, uid, offset, cursor)
+        submitted += 1
+    return submitted
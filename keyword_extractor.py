@@ -0,0 +1,139 @@
+# keyword_extractor.py
+from __future__ import annotations
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from text_normalize import fold
+
+
+class AhoCorasick:
+    """
+    複数語の同時検索オートマトン。構築は語彙サイズに比例し、
+    検索は入力文字列を1回走査するだけで登録語の出現をすべて列挙する。
+    """
+
+    def __init__(self, words: Iterable[str]):
+        # ノードは番号で管理: goto[node][ch] -> node, fail[node], out[node] = そのノードで終わる語の一覧
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for w in set(words):
+            if not w:
+                continue
+            node = 0
+            for ch in w:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(w)
+
+        # 幅優先で失敗リンクを張り、失敗先の出力を引き継ぐ
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """text 中の登録語の出現を (開始位置, 終了位置, 語) で返す"""
+        hits = []
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for w in self._out[node]:
+                hits.append((pos + 1 - len(w), pos + 1, w))
+        return hits
+
+
+# 同義語グラフ: term -> 同じ keywords に並ぶ語の出現項目のうち、この割合以上を共有する語を同義語とみなす
+SYNONYM_MIN_OVERLAP = 0.5
+# 多くの項目に出る一般語（「ルール」「場所」など）は同義語にしない（項目数に対する割合）
+SYNONYM_MAX_DF_RATIO = 0.15
+# 1語あたりの同義語の上限
+SYNONYM_MAX_SIZE = 8
+
+
+def _keyword_lists(entries: Iterable[dict]) -> List[List[str]]:
+    lists = []
+    for it in entries:
+        kws = []
+        for kw in (it.get("keywords") or "").split(","):
+            kw = fold(kw).strip()
+            if kw and kw not in kws:
+                kws.append(kw)
+        lists.append(kws)
+    return lists
+
+
+def keyword_vocabulary(entries: Iterable[dict]) -> List[str]:
+    """各項目の keywords（カンマ区切り）から fold 済みの語彙を作る"""
+    return sorted({kw for kws in _keyword_lists(entries) for kw in kws})
+
+
+def synonym_map(entries: Iterable[dict]) -> Dict[str, FrozenSet[str]]:
+    """
+    keywords の共起から同義語グラフを作る（起動時・再読み込み時に1回）。
+    語 a の出現項目の SYNONYM_MIN_OVERLAP 以上に一緒に現れる語 b を a の同義語とする
+    （例: 「賃料」→「家賃」「使用料」、「たばこ」→「喫煙」「煙草」。キーは fold 済みで、「ロック」は「ろっく」→「施錠」「戸締り」）。
+    検索時は dict を1回引くだけで展開できる。
+    """
+    lists = _keyword_lists(entries)
+    docs: Dict[str, set] = {}
+    for i, kws in enumerate(lists):
+        for kw in kws:
+            docs.setdefault(kw, set()).add(i)
+
+    max_df = max(2, int(len(lists) * SYNONYM_MAX_DF_RATIO))
+    # 共起ペアだけを数える（語彙の全ペアは見ない）
+    shared: Dict[str, Dict[str, int]] = {}
+    for kws in lists:
+        for a in kws:
+            row = shared.setdefault(a, {})
+            for b in kws:
+                if b != a and len(docs[b]) <= max_df:
+                    row[b] = row.get(b, 0) + 1
+
+    result: Dict[str, FrozenSet[str]] = {}
+    for a, row in shared.items():
+        df_a = len(docs[a])
+        cands = [(b, n) for b, n in row.items() if n / df_a >= SYNONYM_MIN_OVERLAP]
+        if not cands:
+            continue
+        # 共起の強い順（Jaccard 係数）に上限まで
+        cands.sort(key=lambda x: (-x[1] / len(docs[a] | docs[x[0]]), x[0]))
+        result[a] = frozenset(b for b, _n in cands[:SYNONYM_MAX_SIZE])
+    return result
+
+
+def extract_terms(automaton: AhoCorasick, text: str) -> List[str]:
+    """
+    自由文から既知のキーワードを抜き出す（出現順・重複なし）。
+    長い語に含まれる短い語（「ごみ出し」中の「ごみ」など）は長い語を優先して落とす。
+    """
+    hits = automaton.find_all(fold(text))
+    # 長い語から採用し、既に採用した範囲に収まる語は捨てる
+    hits.sort(key=lambda h: (-(h[1] - h[0]), h[0]))
+    taken: List[Tuple[int, int, str]] = []
+    for start, end, w in hits:
+        if any(s <= start and end <= e for s, e, _w in taken):
+            continue
+        taken.append((start, end, w))
+
+    terms = []
+    for _s, _e, w in sorted(taken):
+        if w not in terms:
+            terms.append(w)
+    return terms
@@ -0,0 +1,120 @@
+# lazy_listeners.py
+"""
+Bolt の lazy listener 用ヘルパー。
+
+    app.view("presence_modal")(ack=_ack_presence, lazy=[_save_presence])
+
+ack 側（3秒以内に返す部分）は入力チェックと ack() だけにし、重い処理は @lazy_task を付けた
+関数に分ける。lazy 側は引数に context を受け取ること（待ち時間の計測に使う）。
+Socket Mode では ack 関数と lazy 関数は並行に走るため、lazy 側でも入力を再確認すること。
+待ち時間はリクエスト受信（register_lazy_metrics のミドルウェア）から lazy 開始までを測る。
+"""
+from __future__ import annotations
+import functools
+import inspect
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# 集計をログに出す間隔（秒）
+LAZY_STATS_LOG_INTERVAL_SEC = 300
+
+_CTX_RECEIVED_AT = "lazy_received_at"
+
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+_last_logged = time.monotonic()
+
+
+def register_lazy_metrics(app) -> None:
+    """リクエスト受信時刻を context に記録するミドルウェアを登録（lazy 側で待ち時間を計算する）"""
+
+    @app.middleware
+    def _stamp_received_at(context, next):
+        context[_CTX_RECEIVED_AT] = time.monotonic()
+        next()
+
+
+def register_lazy_metrics_async(app) -> None:
+    """register_lazy_metrics の asyncio 版（AsyncApp 用）"""
+
+    @app.middleware
+    async def _stamp_received_at(context, next):
+        context[_CTX_RECEIVED_AT] = time.monotonic()
+        await next()
+
+
+def _record(name: str, queue_sec: float | None, run_sec: float, ok: bool) -> None:
+    global _last_logged
+    with _lock:
+        st = _stats.setdefault(
+            name,
+            {"count": 0, "errors": 0, "queue_total": 0.0, "queue_max": 0.0, "run_total": 0.0, "run_max": 0.0},
+        )
+        st["count"] += 1
+        st["errors"] += 0 if ok else 1
+        if queue_sec is not None:
+            st["queue_total"] += queue_sec
+            st["queue_max"] = max(st["queue_max"], queue_sec)
+        st["run_total"] += run_sec
+        st["run_max"] = max(st["run_max"], run_sec)
+
+        now = time.monotonic()
+        if now - _last_logged < LAZY_STATS_LOG_INTERVAL_SEC:
+            return
+        _last_logged = now
+        summary = "; ".join(
+            f"{n} n={int(s['count'])} err={int(s['errors'])} "
+            f"queue_avg={s['queue_total'] / s['count'] * 1000:.0f}ms queue_max={s['queue_max'] * 1000:.0f}ms "
+            f"run_avg={s['run_total'] / s['count'] * 1000:.0f}ms run_max={s['run_max'] * 1000:.0f}ms"
+            for n, s in sorted(_stats.items())
+        )
+    logger.info("[lazy] %s", summary)
+
+
+def lazy_task(func: Callable) -> Callable:
+    """lazy listener を計測付きで包む（待ち時間・実行時間・例外）。async 関数もそのまま包める"""
+
+    def _queue_sec(kwargs, started: float) -> float | None:
+        context = kwargs.get("context") or {}
+        received_at = context.get(_CTX_RECEIVED_AT)
+        return started - received_at if received_at is not None else None
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(**kwargs):
+            started = time.monotonic()
+            ok = False
+            try:
+                await func(**kwargs)
+                ok = True
+            except Exception:
+                logger.exception("[lazy] %s failed", func.__name__)
+            finally:
+                _record(func.__name__, _queue_sec(kwargs, started), time.monotonic() - started, ok)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(**kwargs):
+        started = time.monotonic()
+        ok = False
+        try:
+            func(**kwargs)
+            ok = True
+        except Exception:
+            logger.exception("[lazy] %s failed", func.__name__)
+        finally:
+            _record(func.__name__, _queue_sec(kwargs, started), time.monotonic() - started, ok)
+
+    return wrapper
+
+
+def lazy_stats() -> Dict[str, Dict[str, float]]:
+    """lazy listener ごとの集計のコピー"""
+    with _lock:
+        return {name: dict(st) for name, st in _stats.items()}
@@ -0,0 +1,124 @@
+# manual_fts.py
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+from peewee import Value, fn
+from playhouse.sqlite_ext import FTS5Model, RowIDField, SearchField
+
+from manuals_loader import entry_hash
+from sqlite_db_presence import db
+from text_normalize import fold, fold_tokens
+
+# trigram トークナイザは3文字未満の語を索引で引けないため、短い語は instr() で絞り込む
+_TRIGRAM = 3
+# bm25 の列重み（title, body, keywords, folded, content_hash）
+_BM25_WEIGHTS = (3.0, 1.0, 2.0, 1.0, 0.0)
+
+
+# manual_fts（マニュアル全文検索：FTS5 + trigram）
+class ManualDoc(FTS5Model):
+    rowid = RowIDField()
+    title = SearchField()
+    body = SearchField()
+    keywords = SearchField()
+    folded = SearchField()  # fold() 済みの title/body/keywords（正規化した検索用）
+    content_hash = SearchField(unindexed=True)  # 差分同期用
+
+    class Meta:
+        database = db
+        table_name = "manual_fts"
+        options = {"tokenize": "trigram"}
+
+
+def sync_manuals(entries: List[dict]) -> int:
+    """
+    entries を FTS テーブルに同期する。内容ハッシュを比べ、変わった項目だけ削除・追加する。
+    返り値: 追加・削除した行数
+    """
+    db.create_tables([ManualDoc])
+    wanted = {}
+    for it in entries:
+        wanted.setdefault(entry_hash(it), it)
+
+    changed = 0
+    with db.atomic():
+        existing = {}
+        for row in ManualDoc.select(ManualDoc.rowid, ManualDoc.content_hash).tuples():
+            existing.setdefault(row[1], []).append(row[0])
+
+        stale = [rid for h, rids in existing.items() for rid in (rids if h not in wanted else rids[1:])]
+        if stale:
+            ManualDoc.delete().where(ManualDoc.rowid.in_(stale)).execute()
+            changed += len(stale)
+
+        for h, it in wanted.items():
+            if h in existing:
+                continue
+            ManualDoc.insert(
+                title=it.get("title", ""),
+                body=it.get("body", ""),
+                keywords=it.get("keywords", ""),
+                folded="\n".join(fold(it.get(k, "")) for k in ("title", "body", "keywords")),
+                content_hash=h,
+            ).execute()
+            changed += 1
+    return changed
+
+
+def search(query: str, limit: Optional[int] = None) -> List[Tuple[str, str, str, float]]:
+    """
+    AND 検索（空白区切り）を FTS5 で実行し、bm25 順に返す。
+    返り値: [(title, body, snippet, score), ...]（score は大きいほど関連度が高い）
+    """
+    tokens = fold_tokens(query)
+    long_toks = [t for t in tokens if len(t) >= _TRIGRAM]
+    short_toks = [t for t in tokens if len(t) < _TRIGRAM]
+
+    if long_toks:
+        # fold() で引用符は除去済みなので、そのままフレーズとして埋め込める
+        expr = " AND ".join(f'"{t}"' for t in long_toks)
+        rank = ManualDoc.bm25(*_BM25_WEIGHTS)
+        q = ManualDoc.select(
+            ManualDoc.title,
+            ManualDoc.body,
+            fn.snippet(ManualDoc._meta.entity, 1, "*", "*", "…", 16).alias("snip"),
+            rank.alias("score"),
+        ).where(ManualDoc.match(expr))
+        q = q.order_by(rank)
+    else:
+        # MATCH が無いと bm25/snippet は使えないため、本文の冒頭を抜粋にしてタイトル順
+        q = ManualDoc.select(
+            ManualDoc.title,
+            ManualDoc.body,
+            fn.substr(ManualDoc.body, 1, 40).alias("snip"),
+            Value(0.0).alias("score"),
+        ).order_by(fn.lower(ManualDoc.title))
+
+    for t in short_toks:
+        q = q.where(fn.instr(ManualDoc.folded, t) > 0)
+    if limit:
+        q = q.limit(limit)
+
+    return [(title, body, snip or "", -float(score or 0)) for title, body, snip, score in q.tuples()]
+
+
+def search_any(terms: Dict[str, float], limit: Optional[int] = None) -> List[Tuple[str, str, float]]:
+    """
+    いずれかの語を含む項目を、含む語の重みの合計が大きい順に返す（OR 検索）。
+    terms: {fold 済みの語: 重み}
+    返り値: [(title, body, score), ...]
+    """
+    if not terms:
+        return []
+    hit_exprs = [(fn.instr(ManualDoc.folded, t) > 0) * w for t, w in terms.items()]
+    score = hit_exprs[0]
+    for e in hit_exprs[1:]:
+        score = score + e
+    q = (
+        ManualDoc.select(ManualDoc.title, ManualDoc.body, score.alias("score"))
+        .where(score > 0)
+        .order_by(score.desc(), fn.lower(ManualDoc.title))
+    )
+    if limit:
+        q = q.limit(limit)
+    return [(title, body, float(sc)) for title, body, sc in q.tuples()]
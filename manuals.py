@@ -1,13 +1,26 @@
 
 # manuals.py
+import threading
 from typing import List, Dict, Any
 from slack_bolt import App
 from slack_sdk.web.client import WebClient
-from database_manager import search_manuals_by_keyword
+from database_manager import add_reload_listener
+from search_cache import cursor_results, open_cursor
+from slack_dispatcher import PRIORITY_MODAL, slack_call
+
+# 描画済みモーダルを保持する件数（空クエリ＋よく使われるクエリ）
+MODAL_CACHE_SIZE = 32
+# クエリ回数の記録上限（超えたら回数の少ない半分を捨てる）
+_QUERY_COUNTS_MAX = 1000
+
+_modal_cache: Dict[str, Dict[str, Any]] = {}
+_query_counts: Dict[str, int] = {}
+_modal_lock = threading.Lock()
 
 
 def _build_manuals_modal(query: str = "") -> Dict[str, Any]:
-    results = search_manuals_by_keyword(query)
+    # 結果セットはカーソルとしてキャッシュし、「開く」ではトークンで引く
+    cursor, results = open_cursor(query)
     blocks: List[Dict[str, Any]] = []
 
     # 検索フィールド
@@ -51,7 +64,7 @@ def _build_manuals_modal(query: str = "") -> Dict[str, Any]:
                         "type": "button",
                         "text": {"type": "plain_text", "text": "開く"},
                         "action_id": "manuals_open_item",
-                        "value": f"{idx}|{query}",
+                        "value": f"{idx}|{cursor}",
                     },
                 }
             )
@@ -63,12 +76,53 @@ def _build_manuals_modal(query: str = "") -> Dict[str, Any]:
     return {
         "type": "modal",
         "callback_id": "manuals_modal",
+        "private_metadata": query or "",  # カーソル期限切れ時の再検索用
         "title": {"type": "plain_text", "text": "シェアハウスマニュアル"},
         "close": {"type": "plain_text", "text": "閉じる"},
         "blocks": blocks,
     }
 
 
+def _clear_modal_cache() -> None:
+    with _modal_lock:
+        _modal_cache.clear()
+
+
+# マニュアルが差し替わったら描画済みモーダルは作り直す
+add_reload_listener(_clear_modal_cache)
+
+
+def _get_manuals_modal(query: str = "") -> Dict[str, Any]:
+    """
+    検索モーダルを返す。空クエリと頻出クエリは描画済みの view をそのまま返す（辞書引きのみ）。
+    返した view は共有なので、呼び出し側で書き換えないこと。
+    """
+    key = (query or "").strip()
+    with _modal_lock:
+        view = _modal_cache.get(key)
+        if view is not None:
+            return view
+        count = _query_counts.get(key, 0) + 1
+        _query_counts[key] = count
+        if len(_query_counts) > _QUERY_COUNTS_MAX:
+            keep = sorted(_query_counts.items(), key=lambda x: -x[1])[: _QUERY_COUNTS_MAX // 2]
+            _query_counts.clear()
+            _query_counts.update(keep)
+
+    view = _build_manuals_modal(key)
+
+    with _modal_lock:
+        if key == "" or len(_modal_cache) < MODAL_CACHE_SIZE:
+            _modal_cache[key] = view
+        elif count >= 2:
+            # 最も使われていないクエリより多く使われていれば入れ替える（空クエリは常に残す）
+            victim = min((k for k in _modal_cache if k), key=lambda k: _query_counts.get(k, 0), default=None)
+            if victim is not None and _query_counts.get(victim, 0) < count:
+                del _modal_cache[victim]
+                _modal_cache[key] = view
+    return view
+
+
 def _build_manual_detail_modal(title: str, body: str) -> Dict[str, Any]:
     return {
         "type": "modal",
@@ -83,12 +137,17 @@ def _build_manual_detail_modal(title: str, body: str) -> Dict[str, Any]:
 
 
 def register_manuals(app: App):
+    # 一番よく開かれる空クエリのモーダルを先に描画しておく
+    _get_manuals_modal()
+
     # Homeのボタン（action_id: "manuals_open"）で開く
     @app.action("manuals_open")
     def _open_from_home(ack, body, client: WebClient, logger):
         ack()
         try:
-            client.views_open(trigger_id=body["trigger_id"], view=_build_manuals_modal())
+            slack_call(
+                client, "views_open", priority=PRIORITY_MODAL, trigger_id=body["trigger_id"], view=_get_manuals_modal()
+            )
         except Exception as e:
             logger.exception(e)
 
@@ -97,7 +156,9 @@ def register_manuals(app: App):
     def _open_from_legacy(ack, body, client: WebClient, logger):
         ack()
         try:
-            client.views_open(trigger_id=body["trigger_id"], view=_build_manuals_modal())
+            slack_call(
+                client, "views_open", priority=PRIORITY_MODAL, trigger_id=body["trigger_id"], view=_get_manuals_modal()
+            )
         except Exception as e:
             logger.exception(e)
 
@@ -105,13 +166,17 @@ def register_manuals(app: App):
     @app.shortcut("open_manuals")
     def _open_from_shortcut(ack, body, client: WebClient, logger):
         ack()
-        client.views_open(trigger_id=body["trigger_id"], view=_build_manuals_modal())
+        slack_call(
+            client, "views_open", priority=PRIORITY_MODAL, trigger_id=body["trigger_id"], view=_get_manuals_modal()
+        )
 
     # スラッシュコマンド /manuals
     @app.command("/manuals")
     def _open_from_command(ack, body, client: WebClient, logger):
         ack()
-        client.views_open(trigger_id=body["trigger_id"], view=_build_manuals_modal())
+        slack_call(
+            client, "views_open", priority=PRIORITY_MODAL, trigger_id=body["trigger_id"], view=_get_manuals_modal()
+        )
 
     # 検索実行
     @app.action("manuals_submit")
@@ -120,16 +185,27 @@ def register_manuals(app: App):
         view_id = body["view"]["id"]
         state = body["view"]["state"]["values"]
         query = state["manuals_search"]["query"].get("value", "")
-        client.views_update(view_id=view_id, view=_build_manuals_modal(query=query))
+        slack_call(
+            client, "views_update", priority=PRIORITY_MODAL, view_id=view_id, view=_get_manuals_modal(query=query)
+        )
 
     # アイテムを開く
     @app.action("manuals_open_item")
     def _open_item(ack, body, client: WebClient, logger):
         ack()
-        idx_str, query = (body["actions"][0]["value"] or "0|").split("|", 1)
+        idx_str, cursor = (body["actions"][0]["value"] or "0|").split("|", 1)
         idx = int(idx_str or "0")
-        results = search_manuals_by_keyword(query)
+        results = cursor_results(cursor)
+        if results is None:
+            # 期限切れ: モーダルに保持したクエリで検索し直す
+            _cursor, results = open_cursor((body.get("view") or {}).get("private_metadata") or "")
         if not results or idx >= len(results):
             return
         title, body_text = results[idx]
-        client.views_push(trigger_id=body["trigger_id"], view=_build_manual_detail_modal(title, body_text))
+        slack_call(
+            client,
+            "views_push",
+            priority=PRIORITY_MODAL,
+            trigger_id=body["trigger_id"],
+            view=_build_manual_detail_modal(title, body_text),
+        )
@@ -0,0 +1,100 @@
+# manuals_loader.py
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 監視間隔（秒）
+WATCH_INTERVAL_SEC = 5.0
+
+
+def entry_hash(it: dict) -> str:
+    """マニュアル1件の内容ハッシュ（変更検出用）"""
+    raw = json.dumps(
+        [it.get("title", ""), it.get("body", ""), it.get("keywords", "")], ensure_ascii=False
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _to_entry(raw) -> dict:
+    if not isinstance(raw, dict) or not raw.get("title"):
+        raise ValueError(f"マニュアル項目の形式が不正です: {raw!r}")
+    keywords = raw.get("keywords", "")
+    if isinstance(keywords, (list, tuple)):
+        keywords = ",".join(str(k) for k in keywords)
+    return {"title": str(raw["title"]), "body": str(raw.get("body") or ""), "keywords": str(keywords or "")}
+
+
+def load_manuals_file(path: str) -> List[dict]:
+    """
+    JSON / YAML のマニュアルファイルを読み込む。
+    形式は MANUALS_DATA と同じ [{title, body, keywords}, ...]（keywords は文字列かリスト）。
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise RuntimeError("YAML を読むには PyYAML をインストールしてください。") from e
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get("manuals", [])
+    if not isinstance(data, list):
+        raise ValueError("マニュアルファイルは項目のリストである必要があります。")
+    return [_to_entry(raw) for raw in data]
+
+
+class ManualsWatcher:
+    """マニュアルファイルの mtime を監視し、変わったら読み込んで on_change に渡すバックグラウンドスレッド"""
+
+    def __init__(self, path: str, on_change: Callable[[List[dict]], None], interval: float = WATCH_INTERVAL_SEC):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._mtime: Optional[float] = self._stat()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="manuals-watcher", daemon=True)
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """1回だけ確認する。再読み込みしたら True"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        try:
+            entries = load_manuals_file(self.path)
+        except Exception:
+            # 書きかけ・不正なファイルは無視し、現在のコーパスを使い続ける（次回の変更で再試行）
+            logger.exception("[manuals] reload failed: %s", self.path)
+            self._mtime = mtime
+            return False
+        self._mtime = mtime
+        self.on_change(entries)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("[manuals] watcher error")
+
+    def start(self) -> "ManualsWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
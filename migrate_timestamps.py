@@ -0,0 +1,160 @@
+# migrate_timestamps.py
+"""
+cleaning_logs.timestamp を1つの書式（UTC naive の "YYYY-MM-DD HH:MM:SS[.ffffff]"）に揃える移行コマンド。
+
+    python migrate_timestamps.py --verify     # 現状の確認だけ（書き込みなし）
+    python migrate_timestamps.py              # 移行（中断しても再実行で続きから）
+    python migrate_timestamps.py --dry-run    # 書き換え件数だけ数える
+    python migrate_timestamps.py --restart    # 進捗を消して最初から
+
+id 順に --batch 件ずつ読み、書式の違う行だけを書き換える（1バッチ = 1トランザクション）。
+進捗（最後に処理した id）は schema_migrations テーブルに記録する。
+解釈できない値は書き換えずに報告する。
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import sys
+from typing import List, Tuple
+
+from sqlite_db_presence import db, init_db, parse_db_datetime, write_transaction
+
+MIGRATION_NAME = "cleaning_logs_timestamp_utc"
+TABLE = "cleaning_logs"
+COLUMN = "timestamp"
+DEFAULT_BATCH = 500
+
+# 正規形（sqlite3 が datetime を保存するときと同じ isoformat(" ")）
+_CANONICAL_GLOBS = (
+    "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]",
+    "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]",
+)
+_IS_CANONICAL_SQL = (
+    f"(typeof({COLUMN}) = 'text' AND ("
+    + " OR ".join(f"{COLUMN} GLOB '{g}'" for g in _CANONICAL_GLOBS)
+    + "))"
+)
+
+
+def canonical(dt: datetime.datetime) -> str:
+    return dt.isoformat(sep=" ")
+
+
+def _ensure_state_table() -> None:
+    db.execute_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name TEXT PRIMARY KEY, last_id INTEGER NOT NULL DEFAULT 0, done_at TEXT)"
+    )
+
+
+def _load_progress() -> Tuple[int, str | None]:
+    row = db.execute_sql("SELECT last_id, done_at FROM schema_migrations WHERE name = ?", (MIGRATION_NAME,)).fetchone()
+    return (row[0], row[1]) if row else (0, None)
+
+
+def _save_progress(last_id: int, done: bool = False) -> None:
+    done_at = canonical(datetime.datetime.utcnow()) if done else None
+    db.execute_sql(
+        "INSERT INTO schema_migrations (name, last_id, done_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id, done_at = excluded.done_at",
+        (MIGRATION_NAME, last_id, done_at),
+    )
+
+
+def migrate(batch: int = DEFAULT_BATCH, dry_run: bool = False, restart: bool = False) -> dict:
+    """移行を実行（または dry_run で数えるだけ）。返り値: 件数の集計"""
+    _ensure_state_table()
+    if restart and not dry_run:
+        db.execute_sql("DELETE FROM schema_migrations WHERE name = ?", (MIGRATION_NAME,))
+    last_id, done_at = (0, None) if (restart or dry_run) else _load_progress()
+
+    stats = {"scanned": 0, "rewritten": 0, "unparseable": [], "resumed_from": last_id}
+    while True:
+        rows: List[tuple] = db.execute_sql(
+            f"SELECT id, {COLUMN} FROM {TABLE} WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, raw in rows:
+            dt = parse_db_datetime(raw)
+            if dt is None:
+                stats["unparseable"].append((row_id, raw))
+                continue
+            value = canonical(dt)
+            if value != raw:
+                updates.append((value, row_id))
+        stats["scanned"] += len(rows)
+        stats["rewritten"] += len(updates)
+        last_id = rows[-1][0]
+        if dry_run:
+            continue
+        with write_transaction():
+            for params in updates:
+                db.execute_sql(f"UPDATE {TABLE} SET {COLUMN} = ? WHERE id = ?", params)
+            _save_progress(last_id)
+        print(f"  ... id <= {last_id}: {stats['scanned']} scanned, {stats['rewritten']} rewritten", file=sys.stderr)
+
+    if not dry_run:
+        _save_progress(last_id, done=True)
+    return stats
+
+
+def verify() -> dict:
+    """書式の内訳と、正規形でない行の例"""
+    total = db.execute_sql(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+    canonical_n = db.execute_sql(f"SELECT COUNT(*) FROM {TABLE} WHERE {_IS_CANONICAL_SQL}").fetchone()[0]
+    by_type = dict(db.execute_sql(f"SELECT typeof({COLUMN}), COUNT(*) FROM {TABLE} GROUP BY 1").fetchall())
+    samples = db.execute_sql(
+        f"SELECT id, {COLUMN} FROM {TABLE} WHERE NOT {_IS_CANONICAL_SQL} ORDER BY id LIMIT 10"
+    ).fetchall()
+    bounds = db.execute_sql(f"SELECT MIN({COLUMN}), MAX({COLUMN}) FROM {TABLE} WHERE {_IS_CANONICAL_SQL}").fetchone()
+    _ensure_state_table()
+    last_id, done_at = _load_progress()
+    return {
+        "total": total,
+        "canonical": canonical_n,
+        "non_canonical": total - canonical_n,
+        "by_type": by_type,
+        "non_canonical_samples": samples,
+        "min": bounds[0],
+        "max": bounds[1],
+        "progress_last_id": last_id,
+        "done_at": done_at,
+    }
+
+
+def _print_verify(report: dict) -> None:
+    print(f"{TABLE}.{COLUMN}: {report['total']} rows, {report['canonical']} canonical, "
+          f"{report['non_canonical']} non-canonical")
+    print(f"  types: {report['by_type']}")
+    print(f"  range: {report['min']} .. {report['max']}")
+    print(f"  migration: last_id={report['progress_last_id']} done_at={report['done_at']}")
+    for row_id, raw in report["non_canonical_samples"]:
+        print(f"  id={row_id}: {raw!r}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="cleaning_logs.timestamp の書式を揃える")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="1トランザクションで処理する行数")
+    parser.add_argument("--dry-run", action="store_true", help="書き換えずに件数だけ数える")
+    parser.add_argument("--restart", action="store_true", help="進捗を消して最初から")
+    parser.add_argument("--verify", action="store_true", help="現状の確認だけ行う")
+    args = parser.parse_args(argv)
+
+    init_db()
+    if not args.verify:
+        stats = migrate(batch=args.batch, dry_run=args.dry_run, restart=args.restart)
+        label = "would rewrite" if args.dry_run else "rewrote"
+        print(f"scanned {stats['scanned']} rows from id>{stats['resumed_from']}, {label} {stats['rewritten']}")
+        for row_id, raw in stats["unparseable"]:
+            print(f"  unparseable id={row_id}: {raw!r}")
+
+    report = verify()
+    _print_verify(report)
+    # 正規形でない行が残っていれば 1（CI やスクリプトから判定できるように）
+    return 0 if report["non_canonical"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
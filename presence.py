@@ -2,15 +2,58 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from slack_sdk.errors import SlackApiError  # ← 任意（ログ用）
-from sqlite_db_presence import db, User, PresenceLog
-from ui_builders import build_home_blocks
+import asyncio
+from sqlite_db_presence import User, PresenceLog, run_in_db, write_transaction
+from ui_builders import invalidate_home_cache
+from home_publisher import fan_out_home, publish_home, publish_home_async
+from lazy_listeners import lazy_task
+from slack_dispatcher import PRIORITY_MODAL, PRIORITY_NORMAL, slack_call, slack_call_async, sync_client
+
+
+def _read_presence_form(body) -> tuple[str, str | None]:
+    state = body["view"]["state"]["values"]
+    status = state["status_block"]["presence_status"]["selected_option"]["value"]
+    note = state.get("note_block", {}).get("presence_note", {}).get("value")
+    return status, note
+
+
+def save_presence(user_id: str, status: str, note: str | None) -> None:
+    """今日の在宅状況を UPSERT して Home のスナップショットを破棄"""
+    user_obj, _ = User.get_or_create(slack_user_id=user_id)
+
+    today_jst = datetime.now(ZoneInfo("Asia/Tokyo")).date()
+    now_utc = datetime.utcnow()
+
+    with write_transaction():
+        (
+            PresenceLog.insert(
+                user=user_obj,
+                date=today_jst,
+                status=status,
+                note=note,
+                updated_at=now_utc,
+            )
+            .on_conflict(
+                conflict_target=[PresenceLog.user, PresenceLog.date],
+                update={
+                    PresenceLog.status: status,
+                    PresenceLog.note: note,
+                    PresenceLog.updated_at: now_utc,
+                },
+            )
+            .execute()
+        )
+    invalidate_home_cache()
 
 
 def register_presence(app):
     @app.action("open_presence")
     def open_presence(ack, body, client, logger):
         ack()
-        client.views_open(
+        slack_call(
+            client,
+            "views_open",
+            priority=PRIORITY_MODAL,
             trigger_id=body["trigger_id"],
             view={
                 "type": "modal",
@@ -47,75 +90,54 @@ def register_presence(app):
             },
         )
 
-    @app.view("presence_modal")
-    def handle_presence_submission(ack, body, client, logger):
-
+    # 受付（ack）だけ即時に返し、DB 更新・DM・Home 更新は lazy listener で行う
+    def _ack_presence(ack):
         ack()
 
+    @lazy_task
+    def handle_presence_submission(body, client, logger, context):
         user_id = body["user"]["id"]
-        state = body["view"]["state"]["values"]
-        status = state["status_block"]["presence_status"]["selected_option"]["value"]
-        note = state.get("note_block", {}).get("presence_note", {}).get("value")
-
-        user_obj, _ = User.get_or_create(slack_user_id=user_id)
-
-        today_jst = datetime.now(ZoneInfo("Asia/Tokyo")).date()
-        now_utc = datetime.utcnow()
-
-        with db.atomic():
-            (
-                PresenceLog.insert(
-                    user=user_obj,
-                    date=today_jst,
-                    status=status,
-                    note=note,
-                    updated_at=now_utc,
-                )
-                .on_conflict(
-                    conflict_target=[PresenceLog.user, PresenceLog.date],
-                    update={
-                        PresenceLog.status: status,
-                        PresenceLog.note: note,
-                        PresenceLog.updated_at: now_utc,
-                    },
-                )
-                .execute()
-            )
+        status, note = _read_presence_form(body)
+        save_presence(user_id, status, note)
 
         try:
-            im = client.conversations_open(users=user_id)
+            im = slack_call(client, "conversations_open", priority=PRIORITY_NORMAL, users=user_id)
             channel_id = im["channel"]["id"]
         except SlackApiError as e:
             logger.error(f"[presence] conversations_open error: {e.response.get('error')}")
             channel_id = user_id
 
-        client.chat_postMessage(
+        slack_call(
+            client,
+            "chat_postMessage",
+            priority=PRIORITY_NORMAL,
             channel=channel_id, text=f"在宅状況を更新しました：{'在宅' if status=='home' else '外出'}"
         )
 
-        client.views_publish(
-            user_id=user_id, view={
-                "type": "home", "blocks": build_home_blocks(client)
-                }
-            )
-    
-    
-    @app.action("presence_quick_home")
-    def presence_quick_home(ack, body, client, logger):
-        _handle_quick_presence(ack, body, client, logger, status="home")
+        publish_home(client, user_id)
+        # 他の閲覧中メンバーの Home も最新に
+        fan_out_home(client, exclude=user_id)
 
-    @app.action("presence_quick_away")
-    def presence_quick_away(ack, body, client, logger):
-        _handle_quick_presence(ack, body, client, logger, status="away")
+    app.view("presence_modal")(ack=_ack_presence, lazy=[handle_presence_submission])
 
-    def _handle_quick_presence(ack, body, client, logger, status: str):
-        ack()
+    @lazy_task
+    def presence_quick_home(body, client, logger, context):
+        _save_quick_presence(body, client, status="home")
+
+    @lazy_task
+    def presence_quick_away(body, client, logger, context):
+        _save_quick_presence(body, client, status="away")
+
+    app.action("presence_quick_home")(ack=_ack_presence, lazy=[presence_quick_home])
+    app.action("presence_quick_away")(ack=_ack_presence, lazy=[presence_quick_away])
+
+    def _save_quick_presence(body, client, status: str):
         user_id = body["user"]["id"]
         user_obj, _ = User.get_or_create(slack_user_id=user_id)
         today_jst = datetime.now(ZoneInfo("Asia/Tokyo")).date()
         now_utc = datetime.utcnow()
 
-        with db.atomic():
+        with write_transaction():
             (PresenceLog
              .insert(user=user_obj, date=today_jst, status=status, updated_at=now_utc)
              .on_conflict(
@@ -123,5 +145,43 @@ def register_presence(app):
                  update={PresenceLog.status: status, PresenceLog.updated_at: now_utc}
              )
              .execute())
-             
-        client.views_publish(user_id=user_id, view={"type": "home", "blocks": build_home_blocks(client)})
+        invalidate_home_cache()
+
+        publish_home(client, user_id)
+        fan_out_home(client, exclude=user_id)
+
+
+def register_presence_async(app):
+    """
+    asyncio 版（AsyncApp）の在宅状況の保存。
+    DB 更新は DB スレッドで行い、DM と Home 更新は並行して送る。
+    """
+
+    async def _ack_presence(ack):
+        await ack()
+
+    @lazy_task
+    async def handle_presence_submission(body, client, logger, context):
+        user_id = body["user"]["id"]
+        status, note = _read_presence_form(body)
+        await run_in_db(save_presence, user_id, status, note)
+
+        async def _notify():
+            try:
+                im = await slack_call_async(client, "conversations_open", users=user_id)
+                channel_id = im["channel"]["id"]
+            except SlackApiError as e:
+                logger.error(f"[presence] conversations_open error: {e.response.get('error')}")
+                channel_id = user_id
+            await slack_call_async(
+                client,
+                "chat_postMessage",
+                channel=channel_id,
+                text=f"在宅状況を更新しました：{'在宅' if status=='home' else '外出'}",
+            )
+
+        await asyncio.gather(_notify(), publish_home_async(client, user_id))
+        # 他の閲覧中メンバーへの再配信は既存のワーカー（共有の同期クライアント）に任せる
+        fan_out_home(sync_client(client), exclude=user_id)
+
+    app.view("presence_modal")(ack=_ack_presence, lazy=[handle_presence_submission])
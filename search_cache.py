@@ -0,0 +1,112 @@
+# search_cache.py
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from database_manager import (
+    add_reload_listener,
+    normalize_query,
+    search_manuals_by_keyword,
+    search_manuals_for_mention,
+)
+
+# 検索結果セットの保持件数と有効期限（秒）
+CACHE_MAXSIZE = 256
+CACHE_TTL_SEC = 600
+# カーソルトークン -> クエリの保持件数（期限なし。結果セットが消えても検索し直せるように）
+QUERY_MAP_MAXSIZE = 10000
+
+_SEARCHERS = {
+    "keyword": search_manuals_by_keyword,  # モーダル検索（AND一致・タイトル順）
+    "mention": search_manuals_for_mention,  # メンション検索（キーワード抽出 + 関連度順）
+}
+
+
+class SearchResultCache:
+    """正規化クエリ単位で検索結果を保持する LRU + TTL キャッシュ（スレッドセーフ）"""
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL_SEC):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, List[Tuple[str, str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[List[Tuple[str, str]]]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                return None
+            expires_at, results = item
+            if expires_at < now:
+                del self._items[token]
+                return None
+            self._items.move_to_end(token)
+            return results
+
+    def put(self, token: str, results: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            self._items[token] = (time.monotonic() + self.ttl, results)
+            self._items.move_to_end(token)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_CACHE = SearchResultCache()
+# マニュアルが再読み込みされたら古い結果セットは捨てる
+add_reload_listener(_CACHE.clear)
+
+# カーソルトークン -> (モード, クエリ)。結果セットとは別に長く持ち、再読み込みでも消さない
+_queries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+_queries_lock = threading.Lock()
+
+
+def _remember_query(token: str, mode: str, query: str) -> None:
+    with _queries_lock:
+        _queries[token] = (mode, query)
+        _queries.move_to_end(token)
+        while len(_queries) > QUERY_MAP_MAXSIZE:
+            _queries.popitem(last=False)
+
+
+def cursor_token(query: str, mode: str = "keyword") -> str:
+    """(モード, 正規化クエリ) から短いカーソルトークンを作る（同じクエリなら同じトークン）"""
+    key = f"{mode}|{normalize_query(query)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def open_cursor(query: str, mode: str = "keyword") -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    検索結果セットをキャッシュに載せ、(カーソルトークン, [(title, body), ...]) を返す。
+    キャッシュ済みなら検索し直さない。
+    """
+    token = cursor_token(query, mode)
+    _remember_query(token, mode, query)
+    results = _CACHE.get(token)
+    if results is None:
+        results = [(r[0], r[1]) for r in _SEARCHERS[mode](query)]
+        _CACHE.put(token, results)
+    return token, results
+
+
+def cursor_results(token: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    カーソルトークンから検索結果セットを引く。結果セットが期限切れ・再読み込みで消えていれば、
+    覚えているクエリで検索し直す。クエリも分からなければ None
+    """
+    results = _CACHE.get(token)
+    if results is not None:
+        return results
+    with _queries_lock:
+        item = _queries.get(token)
+    if item is None:
+        return None
+    mode, query = item
+    return open_cursor(query, mode)[1]
@@ -1,5 +1,6 @@
 # sharehouse_bot_manusal.py
 from slack_sdk.errors import SlackApiError
+from slack_dispatcher import PRIORITY_MODAL, PRIORITY_NORMAL, slack_call
 
 
 def register_bot_manuals(app):
@@ -56,7 +57,10 @@ def register_bot_manuals(app):
         ]
 
         try:
-            client.views_open(
+            slack_call(
+                client,
+                "views_open",
+                priority=PRIORITY_MODAL,
                 trigger_id=trigger_id,
                 view={
                     "type": "modal",
@@ -71,8 +75,11 @@ def register_bot_manuals(app):
             try:
                 user_id = body.get("user", {}).get("id")
                 if user_id:
-                    im = client.conversations_open(users=user_id)
-                    client.chat_postMessage(
+                    im = slack_call(client, "conversations_open", priority=PRIORITY_NORMAL, users=user_id)
+                    slack_call(
+                        client,
+                        "chat_postMessage",
+                        priority=PRIORITY_NORMAL,
                         channel=im["channel"]["id"],
                         text=f"マニュアルを開けませんでした: `{e.response.get('error')}`",
                     )
@@ -0,0 +1,294 @@
+# slack_dispatcher.py
+"""
+Slack Web API の呼び出しを1か所に集める送信キュー。
+
+    slack_call(client, "views_open", priority=PRIORITY_MODAL, trigger_id=..., view=...)
+    await slack_call_async(async_client, "views_publish", user_id=..., view=...)  # AsyncApp から
+
+- メソッドごとのトークンバケット（Slack の Tier 上限に合わせる）
+- 優先度つきキュー（モーダル > 通常の応答 > 裏での Home 再配信）
+- 同じ宛先への views.publish が送信待ちなら、最新の内容だけ送る（古い呼び出しは None で完了）
+- 同じ coalesce_key の送信中は次の送信を待たせる（古い内容が後から届いて上書きしないように）
+- HTTP 429 は Retry-After の間そのメソッドを止めて再送
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Optional
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from handler_metrics import count_slack_call
+
+logger = logging.getLogger(__name__)
+
+# 優先度（小さいほど先に送る）
+PRIORITY_MODAL = 0  # trigger_id の期限（3秒）があるモーダル操作
+PRIORITY_NORMAL = 1  # 操作した本人への応答
+PRIORITY_BACKGROUND = 2  # 他の閲覧者への Home 再配信など
+
+# 1分あたりの上限（Tier 3: 50+/分, Tier 4: 100+/分, chat.postMessage はおおむね 1/秒）
+SLACK_METHOD_LIMITS_PER_MIN: Dict[str, int] = {
+    "views.open": 100,
+    "views.push": 100,
+    "views.update": 100,
+    "views.publish": 100,
+    "chat.postMessage": 60,
+    "chat.update": 50,
+    "conversations.open": 50,
+}
+DEFAULT_LIMIT_PER_MIN = 50
+
+# 送信スレッド数（同期版・asyncio 版で共通。同時に送れる呼び出しの上限）。
+# 1回 0.2〜0.5 秒として 4 本で毎秒 8〜20 回送れ、上のメソッドごとの上限の合計を超えるので、通常はバケットが先に効く
+DISPATCH_WORKERS = int(os.getenv("SLACK_DISPATCH_WORKERS", "4"))
+# 429 の再送回数と、Retry-After が無い場合の待ち時間（秒）
+MAX_RATE_LIMIT_RETRIES = 3
+DEFAULT_RETRY_AFTER_SEC = 1.0
+
+
+def _api_name(method: str) -> str:
+    """WebClient のメソッド名 -> API 名（views_publish -> views.publish）"""
+    return method.replace("_", ".", 1)
+
+
+class _TokenBucket:
+    """トークンバケット（ロックは呼び出し側で持つ）"""
+
+    def __init__(self, per_min: int):
+        self.rate = per_min / 60.0
+        self.capacity = max(1.0, per_min / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """1回送れるまでの秒数（0 なら今すぐ送れる）"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "client", "method", "kwargs", "key", "future", "attempts")
+
+    def __init__(self, priority: int, seq: int, client, method: str, kwargs: dict, key: Optional[Hashable]):
+        self.priority = priority
+        self.seq = seq
+        self.client = client
+        self.method = method
+        self.kwargs = kwargs
+        self.key = key
+        self.future: Future = Future()
+        self.attempts = 0
+
+
+class SlackDispatcher:
+    def __init__(self, workers: int = DISPATCH_WORKERS):
+        self._workers = workers
+        self._jobs: List[_Job] = []
+        self._by_key: Dict[Hashable, _Job] = {}
+        self._in_flight: set = set()  # 送信中の coalesce_key
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self.rate_limited = 0  # 429 を受けた回数
+
+    def _ensure_workers(self) -> None:
+        if self._threads:
+            return
+        for i in range(self._workers):
+            t = threading.Thread(target=self._run, name=f"slack-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(
+        self, client, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[Hashable] = None, **kwargs
+    ) -> Future:
+        """送信を予約して Future を返す。coalesce_key が同じ送信待ちがあれば内容を差し替える"""
+        count_slack_call()
+        with self._cond:
+            self._ensure_workers()
+            job = self._by_key.get(coalesce_key) if coalesce_key is not None else None
+            if job is not None:
+                # 古い呼び出しは「新しい内容で送った」扱いで None を返す
+                job.future.set_result(None)
+                job.future = Future()
+                job.client, job.kwargs = client, kwargs
+                job.priority = min(job.priority, priority)
+            else:
+                job = _Job(priority, next(self._seq), client, method, kwargs, coalesce_key)
+                self._jobs.append(job)
+                if coalesce_key is not None:
+                    self._by_key[coalesce_key] = job
+            self._cond.notify()
+            return job.future
+
+    def call(
+        self, client, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[Hashable] = None, **kwargs
+    ) -> Any:
+        """submit して結果を待つ（Slack のエラーはそのまま送出）"""
+        return self.submit(client, method, priority=priority, coalesce_key=coalesce_key, **kwargs).result()
+
+    def _bucket(self, api: str) -> _TokenBucket:
+        bucket = self._buckets.get(api)
+        if bucket is None:
+            bucket = self._buckets[api] = _TokenBucket(SLACK_METHOD_LIMITS_PER_MIN.get(api, DEFAULT_LIMIT_PER_MIN))
+        return bucket
+
+    def _next_job(self) -> _Job:
+        """今送れるジョブのうち優先度の最も高いものを取り出す（無ければ待つ）"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                best, wait = None, None
+                waits: Dict[str, float] = {}
+                for job in self._jobs:
+                    if job.key is not None and job.key in self._in_flight:
+                        # 同じ宛先の送信が終わるまで待つ（終わったら _finish が起こす）
+                        continue
+                    api = _api_name(job.method)
+                    if api not in waits:
+                        paused = self._paused_until.get(api, 0.0) - now
+                        waits[api] = paused if paused > 0 else self._bucket(api).wait_time(now)
+                    w = waits[api]
+                    if w <= 0:
+                        if best is None or (job.priority, job.seq) < (best.priority, best.seq):
+                            best = job
+                    elif wait is None or w < wait:
+                        wait = w
+                if best is not None:
+                    self._jobs.remove(best)
+                    if best.key is not None:
+                        self._by_key.pop(best.key, None)
+                        self._in_flight.add(best.key)
+                    self._bucket(_api_name(best.method)).take()
+                    return best
+                self._cond.wait(timeout=wait)
+
+    def _finish(self, job: _Job) -> None:
+        """送信が終わった（成功・失敗とも）ので、同じ宛先の次の送信を出せるようにする"""
+        if job.key is None:
+            return
+        with self._cond:
+            self._in_flight.discard(job.key)
+            self._cond.notify_all()
+
+    def _requeue(self, job: _Job, retry_after: float) -> None:
+        with self._cond:
+            if job.key is not None:
+                self._in_flight.discard(job.key)
+            api = _api_name(job.method)
+            self._paused_until[api] = max(self._paused_until.get(api, 0.0), time.monotonic() + retry_after)
+            newer = self._by_key.get(job.key) if job.key is not None else None
+            if newer is not None:
+                # 待っている間に新しい内容が積まれていればそちらを送る
+                job.future.set_result(None)
+            else:
+                self._jobs.append(job)
+                if job.key is not None:
+                    self._by_key[job.key] = job
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if not job.future.set_running_or_notify_cancel():
+                self._finish(job)
+                continue
+            try:
+                result = getattr(job.client, job.method)(**job.kwargs)
+            except SlackApiError as e:
+                if e.response is not None and e.response.status_code == 429 and job.attempts < MAX_RATE_LIMIT_RETRIES:
+                    job.attempts += 1
+                    self.rate_limited += 1
+                    retry_after = _retry_after(e.response)
+                    logger.warning(
+                        "[slack] %s rate limited, retry in %.1fs (attempt %d)", job.method, retry_after, job.attempts
+                    )
+                    # 実行中の Future は差し替えられないので、新しい Future に結果を中継する
+                    running = job.future
+                    job.future = Future()
+                    _chain(job.future, running)
+                    self._requeue(job, retry_after)
+                    continue
+                job.future.set_exception(e)
+            except Exception as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            self._finish(job)
+
+
+def _retry_after(response) -> float:
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SEC
+
+
+def _chain(source: Future, target: Future) -> None:
+    """source の結果を（既に実行中の）target に写す"""
+
+    def _copy(f: Future) -> None:
+        if f.exception() is not None:
+            target.set_exception(f.exception())
+        else:
+            target.set_result(f.result())
+
+    source.add_done_callback(_copy)
+
+
+_dispatcher = SlackDispatcher()
+
+
+def slack_submit(
+    client, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[Hashable] = None, **kwargs
+) -> Future:
+    """共有の送信キューに積む（結果は Future）"""
+    return _dispatcher.submit(client, method, priority=priority, coalesce_key=coalesce_key, **kwargs)
+
+
+def slack_call(
+    client, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[Hashable] = None, **kwargs
+) -> Any:
+    """共有の送信キュー経由で呼び出して結果を待つ"""
+    return _dispatcher.call(client, method, priority=priority, coalesce_key=coalesce_key, **kwargs)
+
+
+_sync_clients: Dict[str, WebClient] = {}
+_sync_clients_lock = threading.Lock()
+
+
+def sync_client(client) -> WebClient:
+    """AsyncWebClient と同じトークンの同期 WebClient（トークンごとに1つを共有）。同期クライアントはそのまま返す"""
+    if isinstance(client, WebClient):
+        return client
+    with _sync_clients_lock:
+        shared = _sync_clients.get(client.token)
+        if shared is None:
+            shared = _sync_clients[client.token] = WebClient(token=client.token)
+        return shared
+
+
+async def slack_call_async(
+    client, method: str, *, priority: int = PRIORITY_NORMAL, coalesce_key: Optional[Hashable] = None, **kwargs
+) -> Any:
+    """
+    slack_call の asyncio 版。送信は同じキュー（同期クライアント）の送信スレッドで行い、完了を await で待つ。
+    待っている間イベントループは空くが、同時に送れるのは DISPATCH_WORKERS 本まで（残りはキューで待つ）
+    """
+    future = _dispatcher.submit(sync_client(client), method, priority=priority, coalesce_key=coalesce_key, **kwargs)
+    return await asyncio.wrap_future(future)
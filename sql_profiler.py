@@ -0,0 +1,123 @@
+# sql_profiler.py
+"""
+SQL プロファイラ（既定は無効）。
+
+    SQL_PROFILE=1                 # 有効化
+    SQL_PROFILE_SAMPLE=0.1        # 1割のクエリだけ記録（負荷が高いとき）
+    SQL_PROFILE_LOG_INTERVAL_SEC=300
+
+クエリを形（リテラル・IN 句の個数を伏せたもの）でまとめ、回数・合計/最大時間・遅い例を記録し、
+合計時間の大きい順に定期的にログへ出す。
+"""
+from __future__ import annotations
+import heapq
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlite_db_presence import add_query_observer
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0").lower() in ("1", "true", "yes", "on")
+SQL_PROFILE_SAMPLE = float(os.getenv("SQL_PROFILE_SAMPLE", "1.0"))
+SQL_PROFILE_LOG_INTERVAL_SEC = float(os.getenv("SQL_PROFILE_LOG_INTERVAL_SEC", "300"))
+# 形ごとに残す遅い例の数と、ログに出す形の数
+SLOWEST_EXAMPLES = 3
+LOG_TOP_SHAPES = 10
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_RE_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """リテラルを ? に、IN (?, ?, ...) を (?+) にまとめたクエリの形"""
+    shape = _RE_STRING.sub("?", sql)
+    shape = _RE_NUMBER.sub("?", shape)
+    shape = _RE_IN_LIST.sub("IN (?+)", shape)
+    return _RE_SPACES.sub(" ", shape).strip()
+
+
+class _ShapeStats:
+    __slots__ = ("count", "total_sec", "max_sec", "slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+        self.slowest: List[Tuple[float, str, str]] = []  # (秒, SQL, パラメータ) の min-heap
+
+
+_stats: Dict[str, _ShapeStats] = {}
+_lock = threading.Lock()
+_last_logged = time.monotonic()
+_installed = False
+
+
+def _observe(sql: str, params, elapsed: float) -> None:
+    global _last_logged
+    if SQL_PROFILE_SAMPLE < 1.0 and random.random() >= SQL_PROFILE_SAMPLE:
+        return
+    shape = normalize_sql(sql)
+    with _lock:
+        st = _stats.get(shape)
+        if st is None:
+            st = _stats[shape] = _ShapeStats()
+        st.count += 1
+        st.total_sec += elapsed
+        st.max_sec = max(st.max_sec, elapsed)
+        if len(st.slowest) < SLOWEST_EXAMPLES:
+            heapq.heappush(st.slowest, (elapsed, sql, repr(params)[:200]))
+        elif elapsed > st.slowest[0][0]:
+            heapq.heapreplace(st.slowest, (elapsed, sql, repr(params)[:200]))
+
+        now = time.monotonic()
+        if now - _last_logged < SQL_PROFILE_LOG_INTERVAL_SEC:
+            return
+        _last_logged = now
+        top = sorted(_stats.items(), key=lambda kv: -kv[1].total_sec)[:LOG_TOP_SHAPES]
+        lines = [
+            f"{s.total_sec * 1000:.1f}ms n={s.count} max={s.max_sec * 1000:.1f}ms  {shape[:160]}" for shape, s in top
+        ]
+    logger.info("[sql] top queries (sample=%.2f)\n%s", SQL_PROFILE_SAMPLE, "\n".join(lines))
+
+
+def install_sql_profiler(force: bool = False) -> bool:
+    """SQL_PROFILE が有効なら（または force）記録を始める。返り値: 有効になったら True"""
+    global _installed
+    if _installed or not (SQL_PROFILE or force):
+        return _installed
+    add_query_observer(_observe)
+    _installed = True
+    logger.info("[sql] profiler enabled (sample=%.2f)", SQL_PROFILE_SAMPLE)
+    return True
+
+
+def sql_profile() -> List[dict]:
+    """クエリの形ごとの集計（合計時間の大きい順）"""
+    with _lock:
+        rows = [
+            {
+                "shape": shape,
+                "count": s.count,
+                "total_sec": s.total_sec,
+                "max_sec": s.max_sec,
+                "slowest": [
+                    {"sec": sec, "sql": sql, "params": params} for sec, sql, params in sorted(s.slowest, reverse=True)
+                ],
+            }
+            for shape, s in _stats.items()
+        ]
+    rows.sort(key=lambda r: -r["total_sec"])
+    return rows
+
+
+def reset_sql_profile() -> None:
+    with _lock:
+        _stats.clear()
@@ -1,7 +1,14 @@
+import asyncio
+import contextvars
 import datetime
+import functools
 import logging
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from peewee import Model, CharField, TextField, DateTimeField, DateField, IntegerField, ForeignKeyField, Check
 from playhouse.db_url import connect
@@ -9,14 +16,130 @@ from playhouse.db_url import connect
 # .envの読み込み
 load_dotenv(override=True)
 
-# 実行したSQLをログで出力する設定
+# 実行したSQLをログで出力する設定（開発時のみ: SQL_DEBUG_LOG=1）
+# 本番の計測は sql_profiler（SQL_PROFILE=1）を使う
 logger = logging.getLogger("peewee")
-logger.addHandler(logging.StreamHandler())
-logger.setLevel(logging.DEBUG)
+if os.getenv("SQL_DEBUG_LOG", "0").lower() in ("1", "true", "yes", "on"):
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.DEBUG)
 
 # データベースへの接続設定
 DATABASE_URL = os.getenv("DATABASE", "sqlite:///peewee_db_presence.sqlite")
-db = connect(DATABASE_URL)  # 環境変数に合わせて変更する場合
+_IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# SQLite の接続ごとの設定（peewee は接続を開くたびに適用する。接続はスレッドごと）
+# WAL: 読み取りが書き込みを待たない / busy_timeout: ロック中は待ってから再試行 / synchronous=NORMAL: WAL なら安全で速い
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "synchronous": "normal",
+    "cache_size": -16 * 1024,  # 16MB（負の値は KiB 単位）
+    "mmap_size": 64 * 1024 * 1024,
+    "foreign_keys": 1,
+}
+# リスナー1回ごとに接続を閉じるか（既定はスレッドごとに開いたまま使い回す）
+DB_CLOSE_AFTER_REQUEST = os.getenv("DB_CLOSE_AFTER_REQUEST", "0").lower() in ("1", "true", "yes", "on")
+# これ以上ロック待ちした書き込みはログに出す（秒）
+LOCK_WAIT_WARN_SEC = 0.5
+
+db = connect(DATABASE_URL, pragmas=SQLITE_PRAGMAS) if _IS_SQLITE else connect(DATABASE_URL)
+
+# 実行した SQL の観測（計測用）。fn(sql, params, elapsed_sec) を execute_sql のたびに呼ぶ
+_query_observers = []
+_execute_sql = db.execute_sql
+
+
+def add_query_observer(fn) -> None:
+    _query_observers.append(fn)
+
+
+def _observed_execute_sql(sql, params=None, *args, **kwargs):
+    if not _query_observers:
+        return _execute_sql(sql, params, *args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return _execute_sql(sql, params, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - started
+        for fn in _query_observers:
+            fn(sql, params, elapsed)
+
+
+db.execute_sql = _observed_execute_sql
+
+# 書き込みのロック待ち時間の集計
+_lock_wait = {"count": 0, "total_sec": 0.0, "max_sec": 0.0}
+_lock_wait_lock = threading.Lock()
+
+
+@contextmanager
+def write_transaction():
+    """
+    書き込み用トランザクション。SQLite では BEGIN IMMEDIATE で最初に書き込みロックを取り、
+    途中でのロック昇格による失敗（database is locked）を避ける。BEGIN にかかった時間をロック待ちとして記録する。
+    """
+    if not _IS_SQLITE:
+        with db.atomic() as txn:
+            yield txn
+        return
+    started = time.perf_counter()
+    with db.atomic(lock_type="IMMEDIATE") as txn:
+        waited = time.perf_counter() - started
+        with _lock_wait_lock:
+            _lock_wait["count"] += 1
+            _lock_wait["total_sec"] += waited
+            _lock_wait["max_sec"] = max(_lock_wait["max_sec"], waited)
+        if waited >= LOCK_WAIT_WARN_SEC:
+            logging.getLogger(__name__).warning("[db] waited %.2fs for the write lock", waited)
+        yield txn
+
+
+def lock_wait_stats() -> dict:
+    """write_transaction のロック待ち（回数・合計・最大）"""
+    with _lock_wait_lock:
+        return dict(_lock_wait)
+
+
+@contextmanager
+def connection_scope():
+    """
+    リスナー1回分の接続管理。開始時にこのスレッドの接続を開き（開いていれば再利用）、
+    終了時に閉じ忘れたトランザクションを戻す（書き込みロックを握ったままにしない）。
+    """
+    db.connect(reuse_if_open=True)
+    try:
+        yield
+    finally:
+        if db.in_transaction():
+            logging.getLogger(__name__).warning("[db] rolling back a transaction left open by a listener")
+            db.rollback()
+            while db.in_transaction():
+                db.pop_transaction()
+        if DB_CLOSE_AFTER_REQUEST and not db.is_closed():
+            db.close()
+
+
+# asyncio 版（async_app.py）で DB 処理を回す専用スレッド（イベントループを止めないため）
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+_db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+
+def call_in_connection_scope(func, *args, **kwargs):
+    """connection_scope の中で func を呼ぶ（executor に渡す用）"""
+    with connection_scope():
+        return func(*args, **kwargs)
+
+
+async def run_in_db(func, *args, **kwargs):
+    """
+    同期の DB 処理を DB 専用スレッドで実行して結果を待つ（同期版のリスナーと同じく connection_scope で囲む）。
+    呼び出し元の ContextVar（計測中のリクエストなど）を引き継ぐ
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, call_in_connection_scope, func, *args, **kwargs)
+    return await loop.run_in_executor(_db_executor, call)
 
 
 # BaseModel（全モデルの共通: database を束ねる）
@@ -48,8 +171,12 @@ class PresenceLog(BaseModel):
 
     class Meta:
         table_name = "presence_logs"
-        # (user, date) をユニークに（UPSERT前提）
-        indexes = ((("user", "date"), True),)
+        indexes = (
+            # (user, date) をユニークに（UPSERT前提）
+            (("user", "date"), True),
+            # 日付の範囲で引く用（掃除当番の候補＝直近に在宅状況を登録した人）
+            (("date",), False),
+        )
 
 
 # events（共有予定：時間はDBではUTC保存）
@@ -88,15 +215,58 @@ class CleaningLog(BaseModel):
         table_name = "cleaning_logs"
         indexes = (
             (("timestamp",), False),
-            (("location",), False),
+            # 場所ごとの最終掃除日（MAX）と場所で絞った履歴に使う（location だけの検索もこれで足りる）
+            (("location", "timestamp"), False),
         )
 
 
+# cleaning_duties（掃除当番：1週間×1か所×1人。week_start は JST の月曜日）
+class CleaningDuty(BaseModel):
+    user = ForeignKeyField(
+        User,
+        to_field="slack_user_id",
+        backref="cleaning_duties",
+        on_delete="CASCADE",
+        column_name="user_id"
+    )
+    week_start = DateField()
+    location = CharField()
+    created_at = DateTimeField(default=datetime.datetime.utcnow)
+
+    class Meta:
+        table_name = "cleaning_duties"
+        indexes = ((("week_start", "location"), True),)
+
+
+def parse_db_datetime(value) -> datetime.datetime | None:
+    """
+    DB に保存された日時を UTC naive の datetime にする（古い行の書式揺れ用）。
+    datetime / ISO 文字列（"T" 区切り・"Z"・オフセット付き）/ bytes / UNIX 秒に対応。解釈できなければ None
+    """
+    if isinstance(value, datetime.datetime):
+        dt = value
+    elif isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).replace(tzinfo=None)
+    elif isinstance(value, (str, bytes)):
+        s = value.decode("utf-8", "ignore") if isinstance(value, bytes) else value
+        s = s.strip()
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        try:
+            dt = datetime.datetime.fromisoformat(s)
+        except ValueError:
+            try:
+                dt = datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                return None
+    else:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt
+
+
 def init_db():
+    # 外部キー・WAL などは SQLITE_PRAGMAS で接続ごとに設定される
     db.connect(reuse_if_open=True)
-    # SQLiteの外部キーを有効化（念のため）
-    try:
-        db.execute_sql("PRAGMA foreign_keys=ON;")
-    except Exception:
-        pass
-    db.create_tables([User, PresenceLog, Event, CleaningLog])
+    db.create_tables([User, PresenceLog, Event, CleaningLog, CleaningDuty])
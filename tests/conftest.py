@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import sys
+
+# ルート直下のモジュール（slack_dispatcher など）を import できるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE", "sqlite:///:memory:")
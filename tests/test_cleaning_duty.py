@@ -0,0 +1,51 @@
+# tests/test_cleaning_duty.py
+from datetime import date, datetime
+
+import pytest
+
+import cleaning_duty
+from sqlite_db_presence import CleaningDuty, PresenceLog, User, db, init_db, lock_wait_stats
+
+
+@pytest.fixture
+def empty_db():
+    # .env の DATABASE が優先された場合に実データを消さない
+    if db.database != ":memory:":
+        pytest.skip("requires DATABASE=sqlite:///:memory:")
+    init_db()
+    for model in (CleaningDuty, PresenceLog, User):
+        model.delete().execute()
+    cleaning_duty._assigned_weeks.clear()
+    yield
+    cleaning_duty._assigned_weeks.clear()
+
+
+def test_week_without_residents_is_retried(empty_db):
+    today = date(2026, 10, 19)
+    week_start = cleaning_duty.duty_week_start(today)
+
+    writes = lock_wait_stats()["count"]
+    cleaning_duty.ensure_week_duties(today)
+    cleaning_duty.ensure_week_duties(today)
+    # 住人がいない間は割り当てず、書き込みロックも取らない
+    assert CleaningDuty.select().count() == 0
+    assert week_start not in cleaning_duty._assigned_weeks
+    assert lock_wait_stats()["count"] == writes
+
+    user = User.create(slack_user_id="U1")
+    PresenceLog.create(user=user, date=today, status="home", updated_at=datetime.utcnow())
+    cleaning_duty.ensure_week_duties(today)
+
+    rows = list(CleaningDuty.select().where(CleaningDuty.week_start == week_start))
+    assert len(rows) == len(cleaning_duty.CLEAN_LOCATIONS)
+    assert {r.user_id for r in rows} == {"U1"}
+    assert week_start in cleaning_duty._assigned_weeks
+
+
+def test_plan_duties_balances_load():
+    locations = [f"L{i}" for i in range(7)]
+    plan = cleaning_duty.plan_duties(locations, ["U1", "U2", "U3"], {}, set())
+
+    assert set(plan) == set(locations)
+    counts = sorted(list(plan.values()).count(uid) for uid in ("U1", "U2", "U3"))
+    assert counts == [2, 2, 3]
@@ -0,0 +1,37 @@
+# tests/test_handler_metrics.py
+import asyncio
+from types import SimpleNamespace
+
+import handler_metrics
+from handler_metrics import count_slack_call, handler_stats, register_handler_metrics_async
+from sqlite_db_presence import db, run_in_db
+
+
+def test_async_dispatch_measures_lazy_tasks():
+    """ack のあとに続くタスクの DB アクセスと Slack 呼び出しも、同じリクエストの計測に入る"""
+
+    async def lazy():
+        await asyncio.sleep(0.05)
+        await run_in_db(lambda: db.execute_sql("SELECT 1").fetchall())
+        count_slack_call()
+
+    async def async_dispatch(req):
+        asyncio.ensure_future(lazy())
+        return "acked"
+
+    app = SimpleNamespace(async_dispatch=async_dispatch)
+    register_handler_metrics_async(app)
+    body = {"type": "block_actions", "actions": [{"action_id": "async_test"}]}
+
+    async def main():
+        assert await app.async_dispatch(SimpleNamespace(body=body)) == "acked"
+        # ack の時点ではまだ記録されない（lazy のタスクが参照を持っている）
+        assert "action:async_test" not in handler_stats()
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    stats = handler_stats()["action:async_test"]
+    assert stats["count"] == 1
+    assert stats["sql_queries"] >= 1
+    assert stats["slack_calls"] == 1
+    assert stats["wall_p50_sec"] >= handler_metrics.LATENCY_BUCKETS_SEC[0]
@@ -0,0 +1,106 @@
+# tests/test_slack_dispatcher.py
+import threading
+import time
+from types import SimpleNamespace
+
+from slack_sdk.errors import SlackApiError
+
+from slack_dispatcher import SlackDispatcher
+
+
+class _FakeClient:
+    """呼ばれた順番を記録する WebClient の代わり（delays の秒数だけ送信に時間がかかる）"""
+
+    def __init__(self, delays=None, errors=None):
+        self.delays = dict(delays or {})
+        self.errors = list(errors or [])
+        self.events = []
+        self._lock = threading.Lock()
+
+    def views_publish(self, user_id, view):
+        name = view["name"]
+        with self._lock:
+            self.events.append(("start", name))
+            error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        time.sleep(self.delays.get(name, 0))
+        with self._lock:
+            self.events.append(("end", name))
+        return {"ok": True, "name": name}
+
+
+def _rate_limited(retry_after="0"):
+    response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after})
+    return SlackApiError("ratelimited", response)
+
+
+def test_same_key_is_not_sent_concurrently():
+    client = _FakeClient(delays={"A": 0.3})
+    dispatcher = SlackDispatcher(workers=4)
+    key = ("views_publish", "U1")
+
+    first = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "A"})
+    time.sleep(0.05)  # A が送信中になってから B を積む
+    second = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "B"})
+
+    assert first.result(timeout=5)["name"] == "A"
+    assert second.result(timeout=5)["name"] == "B"
+    # B は A の送信が終わってから送る（新しい内容が最後に届く）
+    assert client.events == [("start", "A"), ("end", "A"), ("start", "B"), ("end", "B")]
+
+
+def test_queued_jobs_with_same_key_are_coalesced():
+    client = _FakeClient(delays={"A": 0.2})
+    dispatcher = SlackDispatcher(workers=2)
+    key = ("views_publish", "U1")
+
+    first = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "A"})
+    time.sleep(0.05)
+    stale = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "B"})
+    latest = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "C"})
+
+    assert first.result(timeout=5)["name"] == "A"
+    assert stale.result(timeout=5) is None  # 送信待ちの間に C に差し替えられた
+    assert latest.result(timeout=5)["name"] == "C"
+    assert [name for kind, name in client.events if kind == "start"] == ["A", "C"]
+
+
+def test_rate_limited_call_is_retried():
+    client = _FakeClient(errors=[_rate_limited("0.1")])
+    dispatcher = SlackDispatcher(workers=1)
+
+    started = time.monotonic()
+    result = dispatcher.call(
+        client, "views_publish", coalesce_key=("views_publish", "U1"), user_id="U1", view={"name": "A"}
+    )
+
+    assert result["name"] == "A"
+    assert dispatcher.rate_limited == 1
+    assert time.monotonic() - started >= 0.1  # Retry-After の間は待つ
+    assert [name for kind, name in client.events if kind == "start"] == ["A", "A"]
+
+
+def test_newer_content_replaces_rate_limited_call():
+    client = _FakeClient(errors=[_rate_limited("0.2")])
+    dispatcher = SlackDispatcher(workers=2)
+    key = ("views_publish", "U1")
+
+    first = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "A"})
+    time.sleep(0.05)  # A は 429 で Retry-After 待ち
+    second = dispatcher.submit(client, "views_publish", coalesce_key=key, user_id="U1", view={"name": "B"})
+
+    assert first.result(timeout=5) is None  # 待っている間に B に差し替えられた
+    assert second.result(timeout=5)["name"] == "B"
+    assert [name for kind, name in client.events if kind == "start"] == ["A", "B"]
+
+
+def test_rate_limit_gives_up_after_max_retries():
+    client = _FakeClient(errors=[_rate_limited("0")] * 10)
+    dispatcher = SlackDispatcher(workers=1)
+
+    future = dispatcher.submit(client, "views_publish", user_id="U1", view={"name": "A"})
+
+    error = future.exception(timeout=5)
+    assert isinstance(error, SlackApiError)
+    assert dispatcher.rate_limited == 3
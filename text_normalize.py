@@ -0,0 +1,31 @@
+# text_normalize.py
+from __future__ import annotations
+import unicodedata
+
+# カタカナ → ひらがな（ァ〜ヶ, ヽヾ は 0x60 ずらすと対応するひらがなになる）
+_KANA_TABLE = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}
+_KANA_TABLE.update({ord("ヽ"): ord("ゝ"), ord("ヾ"): ord("ゞ")})
+
+# 長音・ハイフン・中黒などは削除（「Wi-Fi」と「WiFi」、「ルール」と「ルル」を寄せる）
+_DROP_CHARS = "ー〜~-‐‑‒–—―−・･'’`"
+# 句読点・括弧類は空白に（別の語がくっついて誤一致しないように）
+_SPACE_CHARS = "、。，,．.！!？?「」『』（）()[]［］【】〈〉《》{}:：;；/／\\|｜\"”“"
+
+_FOLD_TABLE = dict(_KANA_TABLE)
+_FOLD_TABLE.update({ord(c): None for c in _DROP_CHARS})
+_FOLD_TABLE.update({ord(c): " " for c in _SPACE_CHARS})
+
+
+def fold(s: str) -> str:
+    """
+    検索用の正規化: NFKC（全角/半角の統一）→ 小文字化 → カタカナをひらがなに
+    → 長音・記号の除去。索引側は構築時に1回、クエリ側は検索ごとに1回だけ適用する。
+    """
+    if not s:
+        return ""
+    return unicodedata.normalize("NFKC", s).lower().translate(_FOLD_TABLE)
+
+
+def fold_tokens(query: str) -> list:
+    """クエリを正規化して空白区切りのトークン列にする"""
+    return fold(query).split()
@@ -1,9 +1,11 @@
 # ui_builders.py
+import threading
+import time as _time
 from datetime import datetime, timedelta, time, date
 from zoneinfo import ZoneInfo
 from peewee import JOIN
 
-from sqlite_db_presence import User, PresenceLog, Event
+from sqlite_db_presence import User, PresenceLog, Event, CleaningDuty
 
 # ===== 定数 =====
 TZ_JST = ZoneInfo("Asia/Tokyo")
@@ -30,9 +32,13 @@ AID_OPEN_MANUALS = "open_manuals"
 AID_OPEN_PRESENCE = "open_presence"
 AID_OPEN_EVENT_CREATE = "open_event_create"
 
+# 「最終更新」など描画のたびに変わるブロック（内容比較では無視する）
+BID_HOME_RENDERED_AT = "home_rendered_at"
+
 AID_MANUALS_OPEN = "manuals_open"
 AID_CLEANING_OPEN = "cleaning_open"
 AID_CLEANING_HISTORY = "cleaning_history"
+AID_CLEANING_STATUS = "cleaning_status"
 
 
 def _ellipsis(s: str | None, limit: int = 30) -> str:
@@ -93,61 +99,92 @@ def _format_presence_text(rows: list[PresenceLog]) -> str:
     return "\n".join(lines)
 
 
+# Cleaning duties（今週の掃除当番）
+def duty_week_start(d: date) -> date:
+    """当番の週の開始日（JST の月曜日）"""
+    return d - timedelta(days=d.weekday())
+
+
+def _fetch_week_duties(week_start: date) -> list[CleaningDuty]:
+    return list(CleaningDuty.select().where(CleaningDuty.week_start == week_start).order_by(CleaningDuty.id))
+
+
+def _format_duties_text(rows: list[CleaningDuty]) -> str:
+    # 人ごとに担当場所をまとめる（割り当て順を保つ）
+    by_user: dict[str, list[str]] = {}
+    for r in rows:
+        by_user.setdefault(r.user_id, []).append(r.location)
+    return "\n".join(f"・<@{uid}> — {'、'.join(locs)}" for uid, locs in by_user.items())
+
+
 # Events（今週の予定）
-def _fetch_week_event_rows(week_start_jst, week_end_jst) -> list[Event]:
-    # JST の [week_start 00:00, week_end+1 00:00)
+# 1ページに出す予定の件数。1件 = 行 + ボタンの2ブロック、日付見出しは最大7つなので
+# 予定欄は最大 15*2 + 7 + 1（ページ送り）= 38 ブロックに収まる（Slack の上限は100）
+EVENTS_PER_PAGE = 15
+
+AID_EVENTS_MORE = "week_events_more"
+AID_EVENTS_FIRST = "week_events_first"
+
+# 予定一覧のページ位置: 前ページ最後の (start_at, id)。None は先頭ページ
+EventCursor = tuple[datetime, int] | None
+
+
+def encode_event_cursor(week_offset_days: int, cursor: EventCursor) -> str:
+    """ページ送りボタンの value（週オフセット|start_at|id）"""
+    if cursor is None:
+        return str(week_offset_days)
+    start_at, ev_id = cursor
+    return f"{week_offset_days}|{start_at.isoformat()}|{ev_id}"
+
+
+def decode_event_cursor(value: str) -> tuple[int, EventCursor]:
+    """encode_event_cursor の逆。壊れた値は ValueError"""
+    parts = (value or "0").split("|")
+    week_offset_days = int(parts[0])
+    if len(parts) < 3:
+        return week_offset_days, None
+    return week_offset_days, (datetime.fromisoformat(parts[1]), int(parts[2]))
+
+
+def _week_bounds_utc(week_start_jst, week_end_jst) -> tuple[datetime, datetime]:
+    # JST の [week_start 00:00, week_end+1 00:00) を UTC naive で
     lower_jst = datetime.combine(week_start_jst, time(0, 0), tzinfo=TZ_JST)
     upper_jst = datetime.combine(week_end_jst + timedelta(days=1), time(0, 0), tzinfo=TZ_JST)
+    return _to_utc_naive(lower_jst), _to_utc_naive(upper_jst)
 
-    lower_utc_naive = _to_utc_naive(lower_jst)
-    upper_utc_naive = _to_utc_naive(upper_jst)
 
-    rows = (
+def _fetch_week_event_page(week_start_jst, week_end_jst, cursor: EventCursor = None) -> tuple[list[Event], bool]:
+    """
+    週の予定を (start_at, id) 順に1ページ分取得（キーセット方式）。
+    返り値: (予定, 次のページがあるか)
+    """
+    lower_utc_naive, upper_utc_naive = _week_bounds_utc(week_start_jst, week_end_jst)
+
+    query = (
         Event.select(Event, User)
         .join(User, JOIN.LEFT_OUTER)
-        # ここだけ変更（AND 条件 → between に）
         .where(
             Event.start_at.between(
                 lower_utc_naive, upper_utc_naive - timedelta(microseconds=1)  # [lower, upper)
             )
         )
-        .order_by(Event.start_at)
     )
-    return list(rows)
-
-
-def _format_events_text(rows: list[Event]) -> str:
-    if not rows:
-        return "・今週の予定はありません"
-
-    by_day: dict[str, list[str]] = {}
-    for ev in rows:
-        # 時刻・日付（JST）を整形
-        s_hm, e_hm, date_jst = _fmt_range_from_utc_naive(ev.start_at, ev.end_at)
-        day_label = f"{date_jst:%m/%d}（{_weekday_jp(date_jst)}）"
-
-        title = _ellipsis(getattr(ev, "title", ""), 30)
-        memo = getattr(ev, "memo", None)
-        loc = getattr(ev, "location", None)
-        memo_part = f" ｜ {_ellipsis(memo, 24)}" if memo else ""
-        loc_part = f" ｜ 📍{_ellipsis(loc, 20)}" if loc else ""
-
-        created_by_uid = None
-        cb = getattr(ev, "created_by", None)
-        if cb is not None:
-            created_by_uid = getattr(cb, "slack_user_id", None) or cb
-        created_by_part = f" — 作成:<@{created_by_uid}>" if created_by_uid else ""
-
-        line = f"・{s_hm}-{e_hm}  {title}{created_by_part}{memo_part}{loc_part}"
+    if cursor is not None:
+        after_start, after_id = cursor
+        query = query.where(
+            (Event.start_at > after_start) | ((Event.start_at == after_start) & (Event.id > after_id))
+        )
+    rows = list(query.order_by(Event.start_at, Event.id).limit(EVENTS_PER_PAGE + 1))
+    return rows[:EVENTS_PER_PAGE], len(rows) > EVENTS_PER_PAGE
 
-        by_day.setdefault(day_label, []).append(line)
 
-    # 日付順でまとめて文字列化（日付見出しに🗓️）
-    out_lines = []
-    for day in sorted(by_day.keys()):
-        out_lines.append(f"🗓️ *{day}*")
-        out_lines.extend(by_day[day])
-    return "\n".join(out_lines)
+def _count_week_events(week_start_jst, week_end_jst) -> int:
+    lower_utc_naive, upper_utc_naive = _week_bounds_utc(week_start_jst, week_end_jst)
+    return (
+        Event.select()
+        .where(Event.start_at.between(lower_utc_naive, upper_utc_naive - timedelta(microseconds=1)))
+        .count()
+    )
 
 
 def _build_event_blocks(rows: list[Event]) -> list[dict]:
@@ -217,10 +254,90 @@ def _build_event_blocks(rows: list[Event]) -> list[dict]:
     return blocks
 
 
+def _build_event_pager(week_offset_days: int, rows: list[Event], has_more: bool, cursor: EventCursor) -> list[dict]:
+    """予定一覧のページ送り（もっと見る / 先頭へ）。1ページで収まる場合は何も出さない"""
+    elements = []
+    if cursor is not None:
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "« 先頭へ"},
+                "action_id": AID_EVENTS_FIRST,
+                "value": encode_event_cursor(week_offset_days, None),
+            }
+        )
+    if has_more and rows:
+        last = rows[-1]
+        elements.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "もっと見る ▼"},
+                "action_id": AID_EVENTS_MORE,
+                "value": encode_event_cursor(week_offset_days, (last.start_at, _event_pk_value(last))),
+            }
+        )
+    if not elements:
+        return []
+    return [{"type": "actions", "elements": elements}]
+
+
+# ===== Home のスナップショットキャッシュ =====
+# Home は全員に同じ内容なので、(JST の日付, 週オフセット, 予定のページ) ごとに1回だけ描画して使い回す。
+# presence / events / cleaning の書き込み時に invalidate_home_cache() で破棄する。
+HOME_CACHE_TTL_SEC = 600  # 念のための有効期限（他プロセスからの書き込みなど）
+
+_HomeKey = tuple[date, int, EventCursor]
+
+_home_cache: dict[_HomeKey, tuple[float, list]] = {}
+_home_cache_lock = threading.Lock()
+_home_render_locks: dict[_HomeKey, threading.Lock] = {}
+_home_cache_version = 0
+
+
+def invalidate_home_cache() -> None:
+    """Home のスナップショットを破棄（DB 書き込み後に呼ぶ）"""
+    global _home_cache_version
+    with _home_cache_lock:
+        _home_cache.clear()
+        _home_cache_version += 1
+
+
+def _cached_home(key: _HomeKey) -> list | None:
+    with _home_cache_lock:
+        item = _home_cache.get(key)
+        if item is None or item[0] < _time.monotonic():
+            return None
+        return item[1]
+
+
 # Home の blocks
-def build_home_blocks(client, week_offset_days: int = 0) -> list:
+def build_home_blocks(client, week_offset_days: int = 0, cursor: EventCursor = None) -> list:
     today_actual = datetime.now(TZ_JST).date()
-
+    key = (today_actual, week_offset_days, cursor)
+
+    blocks = _cached_home(key)
+    if blocks is not None:
+        return list(blocks)
+
+    with _home_cache_lock:
+        render_lock = _home_render_locks.setdefault(key, threading.Lock())
+    # 同時に開かれても描画は1回（待っていた側はキャッシュを使う）
+    with render_lock:
+        blocks = _cached_home(key)
+        if blocks is not None:
+            return list(blocks)
+        version = _home_cache_version
+        blocks = _render_home_blocks(today_actual, week_offset_days, cursor)
+        with _home_cache_lock:
+            # 描画中に書き込みがあった場合は古い可能性があるので保存しない
+            if version == _home_cache_version:
+                _home_cache[key] = (_time.monotonic() + HOME_CACHE_TTL_SEC, blocks)
+            if len(_home_render_locks) > 64:
+                _home_render_locks.clear()
+    return list(blocks)
+
+
+def _render_home_blocks(today_actual: date, week_offset_days: int, cursor: EventCursor = None) -> list:
     week_base = today_actual + timedelta(days=week_offset_days)
     week_start, week_end = week_base, week_base + timedelta(days=6)
 
@@ -230,8 +347,9 @@ def build_home_blocks(client, week_offset_days: int = 0) -> list:
     presence_heading = f"*今日の在宅状況（{today_actual:%m/%d}）*　{home_n}在宅 / {away_n}外出"
     presence_text = _format_presence_text(presence_rows)
 
-    event_rows = _fetch_week_event_rows(week_start, week_end)
-    events_text = _format_events_text(event_rows)
+    event_rows, has_more = _fetch_week_event_page(week_start, week_end, cursor)
+    # 1ページに収まるときは件数を数え直さない
+    event_total = _count_week_events(week_start, week_end) if (has_more or cursor is not None) else len(event_rows)
 
     blocks = [
         {
@@ -276,6 +394,12 @@ def build_home_blocks(client, week_offset_days: int = 0) -> list:
                     "action_id": "cleaning_history",
                     "value": "open",
                 },
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "📊 掃除状況"},
+                    "action_id": AID_CLEANING_STATUS,
+                    "value": "open",
+                },
                 {
                     "type": "button",
                     "text": {"type": "plain_text", "text": "📄 使用許可（変更）申請書"},
@@ -292,6 +416,21 @@ def build_home_blocks(client, week_offset_days: int = 0) -> list:
         },
     ]
 
+    # 今週の掃除当番（まだ割り当てていない週は出さない）
+    duty_week = duty_week_start(today_actual)
+    duty_rows = _fetch_week_duties(duty_week)
+    if duty_rows:
+        blocks.append(
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*今週の掃除当番（{duty_week:%m/%d} 〜 {duty_week + timedelta(days=6):%m/%d}）*\n"
+                    f"{_format_duties_text(duty_rows)}",
+                },
+            }
+        )
+
     # blocks.append(
     #     {
     #         "type": "section",
@@ -304,7 +443,7 @@ def build_home_blocks(client, week_offset_days: int = 0) -> list:
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": f"*今週の予定（{week_start:%m/%d} 〜 {week_end:%m/%d}）*\n{events_text}",
+                "text": f"*今週の予定（{week_start:%m/%d} 〜 {week_end:%m/%d}）*　全{event_total}件",
             },
         }
     )
@@ -334,11 +473,13 @@ def build_home_blocks(client, week_offset_days: int = 0) -> list:
         }
     )
     blocks.extend(_build_event_blocks(event_rows))
+    blocks.extend(_build_event_pager(week_offset_days, event_rows, has_more, cursor))
 
     rendered_at = datetime.now(TZ_JST)
     blocks.append(
         {
             "type": "context",
+            "block_id": BID_HOME_RENDERED_AT,
             "elements": [{"type": "mrkdwn", "text": f"最終更新: {rendered_at:%H:%M}"}],
         }
     )